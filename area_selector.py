@@ -1,21 +1,22 @@
 import tkinter as tk
-from PIL import ImageGrab, ImageTk
+from tkinter import messagebox
+from PIL import ImageTk
 import numpy as np
+from tiled_capture import grab_region
 
 class AreaSelector:
-    def __init__(self, callback):
+    def __init__(self, callback, on_finish=None):
         self.callback = callback
+        self.on_finish = on_finish
         self.root = None
         self.canvas = None
         self.start_x = None
         self.start_y = None
         self.rect = None
-        self.screenshot = None
         
     def select_area(self):
         """Start area selection process"""
-        # Take screenshot first
-        self.screenshot = ImageGrab.grab()
+        # Only the selected region is captured, once the overlay is hidden
         
         # Create fullscreen overlay
         self.root = tk.Toplevel()
@@ -68,12 +69,30 @@ class AreaSelector:
             
             # Ensure minimum size
             if abs(x2 - x1) > 10 and abs(y2 - y1) > 10:
-                # Crop the screenshot
-                cropped = self.screenshot.crop((x1, y1, x2, y2))
-                self.callback(cropped)
+                # Hide the overlay and give the screen a moment to repaint before grabbing
+                self.root.withdraw()
+                self.root.after(150, lambda: self._grab_selection((x1, y1, x2, y2)))
+                return
             
+        self._finish()
+    
+    def _grab_selection(self, bbox):
+        """Capture just the selected region so memory scales with the selection"""
+        try:
+            cropped = grab_region(bbox)
+        except Exception as e:
+            self._finish()
+            messagebox.showerror("Error", f"Area capture failed: {str(e)}")
+            return
+        self._finish()
+        self.callback(cropped)
+    
+    def _finish(self):
+        """Close the overlay and let the caller restore its window"""
         self.root.destroy()
+        if self.on_finish:
+            self.on_finish()
         
     def cancel_selection(self, event=None):
         """Cancel the selection"""
-        self.root.destroy() 
\ No newline at end of file
+        self._finish() 
\ No newline at end of file
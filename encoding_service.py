@@ -0,0 +1,176 @@
+import os
+import io
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from PIL import Image
+
+
+class SharedImage:
+    """Raw pixels of a capture in shared memory, readable by worker processes without copying"""
+    def __init__(self, image):
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        data = image.tobytes()
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        self.shm.buf[:len(data)] = data
+        self.mode = image.mode
+        self.size = image.size
+        self.refs = 0
+
+    @property
+    def descriptor(self):
+        """Picklable handle sent to workers instead of the pixels"""
+        return (self.shm.name, self.mode, self.size)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _open_untracked(name):
+    """Attach to a shared memory block owned by the parent without registering it for cleanup
+
+    Workers may share the parent's resource tracker or have their own, so
+    they must neither register the block (their tracker would unlink it on
+    exit) nor unregister it (which would drop the parent's registration).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _attach(descriptor):
+    """Open a shared image inside a worker process"""
+    name, mode, size = descriptor
+    shm = _open_untracked(name)
+    image = Image.frombuffer(mode, size, shm.buf, 'raw', mode, 0, 1)
+    return shm, image
+
+
+def _with_shared_image(descriptor, work):
+    """Run work(image) on a shared image and detach afterwards"""
+    shm, image = _attach(descriptor)
+    try:
+        return work(image)
+    finally:
+        # The image holds a view on the buffer and must go before the block is closed
+        del image
+        shm.close()
+
+
+def _encode_png(descriptor, crop=None, scale=1.0):
+    """Worker: crop, downscale and PNG-encode a shared image"""
+    def work(image):
+        if crop:
+            image = image.crop(crop)
+        if scale < 1.0:
+            width, height = image.size
+            new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
+        img_buffer = io.BytesIO()
+        image.save(img_buffer, format='PNG')
+        return img_buffer.getvalue(), image.size
+    return _with_shared_image(descriptor, work)
+
+
+def _save_archive(descriptor, path):
+    """Worker: save the archived copy of a shared image"""
+    def work(image):
+        image.save(path)
+        return path
+    return _with_shared_image(descriptor, work)
+
+
+def _make_thumbnail(descriptor, box_size):
+    """Worker: aspect-preserving thumbnail that fits in box_size, returned as raw RGB"""
+    def work(image):
+        box_width, box_height = box_size
+        width, height = image.size
+        scale = min(box_width / width, box_height / height)
+        new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        thumbnail = image.convert('RGB').resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        return thumbnail.tobytes(), thumbnail.size, scale
+    return _with_shared_image(descriptor, work)
+
+
+def _noop():
+    return None
+
+
+class EncodingService:
+    """Process pool that produces the archive, preview and upload variants of captures in parallel"""
+    def __init__(self, max_workers=None):
+        # At least two workers, so tray images are encoded side by side even on dual-core machines
+        self.max_workers = max_workers or max(2, min(8, (os.cpu_count() or 2) - 1))
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        # Previews get their own worker so they never queue behind archive or upload encodes
+        self.preview_executor = ProcessPoolExecutor(max_workers=1)
+        self.lock = threading.Lock()
+        self.shared = {}
+        self.warm_up()
+
+    def warm_up(self):
+        """Start the worker processes before anything is shared, so the first capture doesn't pay for it"""
+        for _ in range(self.max_workers):
+            self.executor.submit(_noop)
+        self.preview_executor.submit(_noop)
+
+    def share(self, image):
+        """Copy image into shared memory once; repeated calls reuse the same block"""
+        with self.lock:
+            entry = self.shared.get(id(image))
+            if entry is None or entry[0] is not image:
+                entry = (image, SharedImage(image))
+                self.shared[id(image)] = entry
+            entry[1].refs += 1
+            return entry[1]
+
+    def release(self, shared):
+        """Drop one reference to a shared image, freeing it when unused"""
+        with self.lock:
+            shared.refs -= 1
+            if shared.refs > 0:
+                return
+            for key, (image, entry) in list(self.shared.items()):
+                if entry is shared:
+                    del self.shared[key]
+            shared.close()
+
+    def _submit(self, shared, fn, *args, executor=None):
+        """Submit fn for a shared image, keeping it alive until the worker is done"""
+        with self.lock:
+            shared.refs += 1
+        future = (executor or self.executor).submit(fn, shared.descriptor, *args)
+        future.add_done_callback(lambda _: self.release(shared))
+        return future
+
+    def encode_png(self, shared, crop=None, scale=1.0):
+        """Future of (png_bytes, size) for a crop of shared, optionally downscaled"""
+        return self._submit(shared, _encode_png, crop, scale)
+
+    def save(self, shared, path):
+        """Future of path once the archived copy has been written"""
+        return self._submit(shared, _save_archive, path)
+
+    def thumbnail(self, shared, box_size):
+        """Future of (rgb_bytes, size, scale) for a preview that fits in box_size"""
+        return self._submit(shared, _make_thumbnail, box_size, executor=self.preview_executor)
+
+    def shutdown(self):
+        """Stop the worker processes and free any shared images"""
+        self.executor.shutdown(wait=True)
+        self.preview_executor.shutdown(wait=True)
+        with self.lock:
+            for image, entry in self.shared.values():
+                entry.close()
+            self.shared.clear()
@@ -0,0 +1,136 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _count_images(provider, body):
+    """Number of images attached to a provider request body"""
+    if provider == 'gemini':
+        parts = [part for content in body.get('contents', []) for part in content.get('parts', [])]
+        return sum(1 for part in parts if 'inline_data' in part)
+    blocks = [block for message in body.get('messages', []) for block in message.get('content', [])
+              if isinstance(block, dict)]
+    image_type = 'image_url' if provider == 'openai' else 'image'
+    return sum(1 for block in blocks if block.get('type') == image_type)
+
+
+def _response_body(provider, text):
+    """Wrap text in the provider's response format"""
+    if provider == 'openai':
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]
+        }
+    if provider == 'claude':
+        return {
+            "id": "msg_fake",
+            "type": "message",
+            "role": "assistant",
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn"
+        }
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]
+    }
+
+
+class FakeProviderServer:
+    """Local HTTP server that answers OpenAI, Gemini and Claude requests from a script
+
+    The script maps each provider to a reply, or a list of replies served in
+    order (the last one repeats). A reply may set latency (seconds),
+    status, text, or a raw body. Without a script every request gets an
+    immediate reply describing what was received.
+    """
+    def __init__(self, script=None, host='127.0.0.1', port=0):
+        if isinstance(script, str):
+            with open(script) as f:
+                script = json.load(f)
+        self.script = script or {}
+        self.lock = threading.Lock()
+        self.counts = {}
+        # (provider, request body bytes, image count) of every request received
+        self.requests = []
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.thread = None
+
+    @property
+    def base_urls(self):
+        host, port = self.server.server_address[:2]
+        base_url = f"http://{host}:{port}"
+        return {'openai': base_url, 'gemini': base_url, 'claude': base_url}
+
+    def _next_reply(self, provider):
+        """Scripted reply for the next request to provider"""
+        replies = self.script.get(provider, {})
+        if isinstance(replies, dict):
+            replies = [replies]
+        with self.lock:
+            count = self.counts.get(provider, 0)
+            self.counts[provider] = count + 1
+        reply = replies[min(count, len(replies) - 1)] if replies else {}
+        return dict(self.script.get('default', {}), **reply)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_POST(self):
+                if self.path.startswith('/v1/chat/completions'):
+                    provider = 'openai'
+                elif self.path.startswith('/v1/messages'):
+                    provider = 'claude'
+                elif ':generateContent' in self.path:
+                    provider = 'gemini'
+                else:
+                    self.send_error(404)
+                    return
+
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                with server.lock:
+                    server.requests.append((provider, length, _count_images(provider, body)))
+                reply = server._next_reply(provider)
+
+                time.sleep(reply.get('latency', 0))
+                text = reply.get('text', f"Fake {provider} response for {_count_images(provider, body)} image(s)")
+                payload = json.dumps(reply.get('body', _response_body(provider, text))).encode('utf-8')
+
+                self.send_response(reply.get('status', 200))
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Serve in a background thread"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake AI provider server for offline testing")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--script', help="JSON file with scripted replies per provider")
+    args = parser.parse_args()
+
+    fake_server = FakeProviderServer(script=args.script, port=args.port)
+    print(f"Fake provider server listening on {fake_server.base_urls['openai']}")
+    fake_server.server.serve_forever()
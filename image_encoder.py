@@ -0,0 +1,169 @@
+import base64
+from concurrent.futures import CancelledError, wait
+
+MB = 1000 * 1000
+
+# Each API's limits on base64 image data: (whole request, single image)
+UPLOAD_LIMITS = {
+    'openai': (50 * MB, 20 * MB),
+    'gemini': (20 * MB, 20 * MB),  # inline data counts towards the 20 MB request limit
+    'claude': (32 * MB, 5 * MB)
+}
+
+# Room left in every request for the question and the JSON around the images
+REQUEST_HEADROOM = 64 * 1024
+
+
+def upload_budget(request_limit, image_limit):
+    """Raw encoded-byte budget (whole request, single image) whose base64 text fits the limits"""
+    return ((request_limit - REQUEST_HEADROOM) // 4 * 3, image_limit // 4 * 3)
+
+
+# Budgets are (request bytes, image bytes) of raw encoded image data
+DEFAULT_BYTE_BUDGET = upload_budget(20 * MB, 5 * MB)
+UPLOAD_BYTE_BUDGETS = {provider: upload_budget(*limits) for provider, limits in UPLOAD_LIMITS.items()}
+
+# Images are never downscaled below this edge length while fitting the budget
+MIN_EDGE = 256
+
+
+class EncodedImage:
+    """An image encoded once and ready to be attached to any AI request"""
+    def __init__(self, data, size, media_type='image/png'):
+        self.data = data
+        self.size = size
+        self.media_type = media_type
+        self.b64 = base64.b64encode(data).decode('utf-8')
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+
+def _fits(encoded, byte_budget):
+    request_bytes, image_bytes = byte_budget
+    return (sum(item.nbytes for item in encoded) <= request_bytes
+            and all(item.nbytes <= image_bytes for item in encoded))
+
+
+class ImageEncoder:
+    """Encodes batches of images for upload on the shared encoding process pool"""
+    def __init__(self, service):
+        self.service = service
+
+    def _wait(self, futures, cancel_event):
+        """Collect encode results, abandoning them if the work is cancelled"""
+        while not all(future.done() for future in futures):
+            if cancel_event is not None and cancel_event.is_set():
+                for future in futures:
+                    future.cancel()
+                raise CancelledError()
+            wait(futures, timeout=0.05)
+        try:
+            return [EncodedImage(*future.result()) for future in futures]
+        except Exception as e:
+            raise Exception(f"Failed to encode image: {str(e)}")
+
+    def _fit_budget(self, sources, encoded, byte_budget, cancel_event):
+        """Downscale images over the per-image cap or their share until the batch fits byte_budget"""
+        request_bytes, image_bytes = byte_budget
+        for _ in range(3):
+            if _fits(encoded, byte_budget):
+                return encoded
+
+            # Images already at MIN_EDGE cannot shrink; their bytes come off the top
+            min_scales = [min(1.0, MIN_EDGE / max(1, min(size))) for _, _, size in sources]
+            flexible = [i for i, (item, (_, _, size)) in enumerate(zip(encoded, sources))
+                        if item.size[0] / size[0] > min_scales[i] * 1.001]
+            available = request_bytes - sum(item.nbytes for i, item in enumerate(encoded) if i not in flexible)
+
+            # Every image is held to the per-image cap first
+            targets = {i: min(encoded[i].nbytes, image_bytes) for i in flexible}
+            if flexible and sum(targets.values()) > available:
+                # Images under an even split keep their bytes; the rest share what is left
+                fair_share = available / len(flexible)
+                small_total = sum(target for target in targets.values() if target <= fair_share)
+                large_total = sum(targets.values()) - small_total
+                for i, target in targets.items():
+                    if target > fair_share:
+                        targets[i] = max(0.0, (available - small_total) * target / large_total)
+
+            indices = [i for i in flexible if targets[i] < encoded[i].nbytes]
+            if not indices:
+                break
+            futures = []
+            for i in indices:
+                (shared, crop, size), item = sources[i], encoded[i]
+                # Encoded size grows roughly with pixel count
+                scale = (targets[i] / item.nbytes) ** 0.5 * item.size[0] / size[0] * 0.9
+                futures.append(self.service.encode_png(shared, crop, max(scale, min_scales[i])))
+
+            encoded = list(encoded)
+            for i, item in zip(indices, self._wait(futures, cancel_event)):
+                encoded[i] = item
+
+        total = sum(item.nbytes for item in encoded)
+        if total > request_bytes:
+            raise Exception(f"Images too large to send: {total} bytes exceeds budget of {request_bytes}")
+        largest = max(item.nbytes for item in encoded)
+        if largest > image_bytes:
+            raise Exception(f"Image too large to send: {largest} bytes exceeds per-image limit of {image_bytes}")
+        return encoded
+
+    def _share_sources(self, images):
+        """Share each (image, crop box) pair and note the size of its cropped region"""
+        sources = []
+        try:
+            for image, crop in images:
+                shared = self.service.share(image)
+                size = (crop[2] - crop[0], crop[3] - crop[1]) if crop else image.size
+                sources.append((shared, crop, size))
+        except Exception:
+            self._release_sources(sources)
+            raise
+        return sources
+
+    def _release_sources(self, sources):
+        for shared, _, _ in sources:
+            self.service.release(shared)
+
+    def encode_base(self, images, cancel_event=None):
+        """Encode (image, crop box) pairs at full size; shared by every provider variant"""
+        sources = self._share_sources(images)
+        try:
+            return self._wait([self.service.encode_png(shared, crop) for shared, crop, _ in sources],
+                              cancel_event)
+        finally:
+            self._release_sources(sources)
+
+    def fit_budget(self, images, encoded, byte_budget, cancel_event=None):
+        """Fit full-size encodings of images to a (request, image) byte_budget, re-encoding only when needed"""
+        if _fits(encoded, byte_budget):
+            return encoded
+        sources = self._share_sources(images)
+        try:
+            return self._fit_budget(sources, encoded, byte_budget, cancel_event)
+        finally:
+            self._release_sources(sources)
+
+    def encode_untrimmed(self, images, encoded):
+        """Start encoding each cropped image whole, at the scale its upload was sent
+
+        Returns one future of (png_bytes, size) per image, or None where the
+        image was not cropped, so the saving from trimming can be measured.
+        """
+        futures = []
+        for (image, crop), item in zip(images, encoded):
+            if not crop:
+                futures.append(None)
+                continue
+            shared = self.service.share(image)
+            try:
+                futures.append(self.service.encode_png(shared, None, item.size[0] / (crop[2] - crop[0])))
+            finally:
+                self.service.release(shared)
+        return futures
+
+    def prepare(self, images, byte_budget=DEFAULT_BYTE_BUDGET, cancel_event=None):
+        """Apply each (image, crop box) pair's crop and encode the batch for upload"""
+        return self.fit_budget(images, self.encode_base(images, cancel_event), byte_budget, cancel_event)
@@ -0,0 +1,127 @@
+import ctypes
+import sys
+import numpy as np
+from tiled_capture import dpi_aware
+
+# Pixels within this distance of the border colour count as empty margin
+BORDER_TOLERANCE = 12
+
+# Minimum brightness step between neighbouring pixels that counts as detail
+DETAIL_THRESHOLD = 24
+
+# Rows/columns need at least this fraction of detailed pixels to be kept
+MIN_DETAIL_FRACTION = 0.004
+
+# Extra pixels kept around the detected content
+CONTENT_MARGIN = 8
+
+# Images are analysed at roughly this size; the box is scaled back afterwards
+ANALYSIS_EDGE = 1024
+
+
+def _to_gray(image):
+    """Return a reduced grayscale array of the image and the reduction factor"""
+    factor = max(1, -(-max(image.size) // ANALYSIS_EDGE))
+    gray = image.convert('L')
+    if factor > 1:
+        gray = gray.reduce(factor)
+    return np.asarray(gray, dtype=np.int16), factor
+
+
+def find_border_box(gray, tolerance=BORDER_TOLERANCE):
+    """Bounding box of everything that differs from the uniform border colour"""
+    corners = np.array([gray[0, 0], gray[0, -1], gray[-1, 0], gray[-1, -1]])
+    background = int(np.median(corners))
+    content = np.abs(gray - background) > tolerance
+
+    rows = np.flatnonzero(content.any(axis=1))
+    cols = np.flatnonzero(content.any(axis=0))
+    if not rows.size or not cols.size:
+        return None
+    return (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+
+
+def find_detail_box(gray, threshold=DETAIL_THRESHOLD, min_fraction=MIN_DETAIL_FRACTION):
+    """Bounding box of rows and columns containing high-detail content"""
+    height, width = gray.shape
+    edges = np.zeros(gray.shape, dtype=bool)
+    edges[:, 1:] |= np.abs(np.diff(gray, axis=1)) > threshold
+    edges[1:, :] |= np.abs(np.diff(gray, axis=0)) > threshold
+
+    rows = np.flatnonzero(edges.sum(axis=1) > width * min_fraction)
+    cols = np.flatnonzero(edges.sum(axis=0) > height * min_fraction)
+    if not rows.size or not cols.size:
+        return None
+    return (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+
+
+def compute_crop_box(image, trim=True, window_rect=None):
+    """Work out the region of image worth uploading, or None to keep it whole"""
+    width, height = image.size
+    left, top, right, bottom = 0, 0, width, height
+
+    # Restrict to the focused window first, if it overlaps the capture
+    if window_rect:
+        wl, wt, wr, wb = window_rect
+        wl, wt = max(left, wl), max(top, wt)
+        wr, wb = min(right, wr), min(bottom, wb)
+        if wr - wl > 10 and wb - wt > 10:
+            left, top, right, bottom = wl, wt, wr, wb
+
+    if trim:
+        region = image.crop((left, top, right, bottom)) if (left, top, right, bottom) != (0, 0, width, height) else image
+        gray, factor = _to_gray(region)
+        if gray.shape[0] > 2 and gray.shape[1] > 2:
+            box = find_border_box(gray)
+            if box:
+                bl, bt, br, bb = box
+                detail = find_detail_box(gray[bt:bb, bl:br])
+                if detail:
+                    box = (bl + detail[0], bt + detail[1], bl + detail[2], bt + detail[3])
+
+                # Scale back to full resolution and keep a small margin
+                margin = CONTENT_MARGIN + factor
+                rw, rh = region.size
+                left, top, right, bottom = (
+                    left + max(0, box[0] * factor - margin),
+                    top + max(0, box[1] * factor - margin),
+                    left + min(rw, box[2] * factor + margin),
+                    top + min(rh, box[3] * factor + margin)
+                )
+
+    box = (left, top, right, bottom)
+    if box == (0, 0, width, height):
+        return None
+    return box
+
+
+def find_focused_window_rect(exclude_hwnd=None):
+    """Screen rectangle of the top-most regular window below this app (Windows only)"""
+    if sys.platform != 'win32':
+        return None
+
+    import ctypes.wintypes
+
+    user32 = ctypes.windll.user32
+    user32.GetTopWindow.restype = ctypes.wintypes.HWND
+    user32.GetWindow.restype = ctypes.wintypes.HWND
+    GW_HWNDNEXT = 2
+    GWL_EXSTYLE = -20
+    WS_EX_TOPMOST = 0x00000008
+
+    rect = ctypes.wintypes.RECT()
+
+    # Window rectangles must be in the same physical pixels as the grabbed screenshot
+    with dpi_aware():
+        hwnd = user32.GetTopWindow(None)
+        while hwnd:
+            if (hwnd != exclude_hwnd
+                    and user32.IsWindowVisible(hwnd)
+                    and not user32.IsIconic(hwnd)
+                    and user32.GetWindowTextLengthW(hwnd) > 0
+                    and not user32.GetWindowLongW(hwnd, GWL_EXSTYLE) & WS_EX_TOPMOST
+                    and user32.GetWindowRect(hwnd, ctypes.byref(rect))):
+                if rect.right - rect.left > 10 and rect.bottom - rect.top > 10:
+                    return (rect.left, rect.top, rect.right, rect.bottom)
+            hwnd = user32.GetWindow(hwnd, GW_HWNDNEXT)
+    return None
@@ -2,27 +2,20 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import requests
 import json
-import base64
-import io
-from PIL import Image, ImageTk, ImageGrab
+from PIL import Image, ImageTk, ImageGrab, ImageDraw
 import threading
+import time
 import os
 from datetime import datetime
 import configparser
 from area_selector import AreaSelector
-
-# Try to import optional dependencies
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-
-try:
-    import anthropic
-    CLAUDE_AVAILABLE = True
-except ImportError:
-    CLAUDE_AVAILABLE = False
+from encoding_service import EncodingService
+from image_encoder import ImageEncoder, DEFAULT_BYTE_BUDGET, UPLOAD_BYTE_BUDGETS
+from image_trimmer import compute_crop_box, find_focused_window_rect
+from providers import send_request
+from speculative_upload import SpeculativeUploader
+from tiled_capture import TiledCapture, TILE_SIZE
+from transport import create_transport
 
 class ModernButton(tk.Button):
     """Custom modern button with hover effects"""
@@ -113,18 +106,83 @@ class MultiAPIAssistant:
             'claude': ''
         }
         self.selected_api = 'openai'
+        
+        # Pre-upload trimming and tiled capture options
+        self.capture_options = {
+            'auto_trim': False,
+            'window_crop': False,
+            'tiled': False,
+            'tile_overview': True,
+            'skip_unchanged_tiles': True,
+            'tile_size': TILE_SIZE
+        }
+        
+        # Provider transport: live, record, replay or fake
+        self.transport_options = {
+            'mode': 'live',
+            'cassette_dir': 'cassettes',
+            'fake_script': '',
+            'fake_url': '',
+            'replay_latency': 'false'
+        }
         self.load_config()
+        # The environment override applies to this run only and is never saved to config.ini
+        self.transport_mode = os.environ.get('INSTANTSCREENAI_TRANSPORT') or self.transport_options['mode']
         
         # Screenshot data
         self.current_screenshot = None
         self.screenshot_path = None
+        self.current_crop = None
+        self.capture_window_rect = None
+        self.current_tile_boxes = []
+        self.preview_generation = 0
+        self.tiled_capture = TiledCapture(tile_size=self.capture_options['tile_size'])
+        self.tiled_capture_running = False
+        # Overview and detail tiles of the current tiled capture, sent instead of the screenshot
+        self.tiled_images = []
+        self.capture_generation = 0
+        
+        # Capture tray for multi-image questions
+        self.capture_tray = []
+        
+        # Process pool producing archive, preview and upload variants of each capture
+        self.encoding_service = EncodingService()
+        self.current_shared = None
+        self.image_encoder = ImageEncoder(self.encoding_service)
+        
+        # Background encoding and connection warm-up right after capture
+        self.speculative_upload = SpeculativeUploader(self.image_encoder)
+        self.http_session = requests.Session()
+        transport_error = None
+        try:
+            self.transport = self._create_transport(self.transport_mode)
+        except Exception as e:
+            # A typo in the mode or a broken fake script must not stop the app from starting
+            transport_error = f"Could not use transport '{self.transport_mode}': {str(e)}\n\nFalling back to live."
+            self.transport_mode = 'live'
+            self.transport = self._create_transport('live')
         
         # Area selector
-        self.area_selector = AreaSelector(self.on_area_selected)
+        self.area_selector = AreaSelector(self.on_area_selected, on_finish=self.root.deiconify)
         
         self.setup_ui()
         self.center_window()
         
+        if self.transport.offline:
+            self.status_var.set(f"🧪 Offline mode ({self.transport_mode}) - no API keys needed")
+        if transport_error:
+            self.root.after(0, lambda: messagebox.showerror("Transport Error", transport_error))
+        
+    def _create_transport(self, mode):
+        """Provider transport for mode, configured from the [Transport] options"""
+        replay_latency = self.transport_options['replay_latency'].strip().lower() in ('1', 'true', 'yes', 'on')
+        return create_transport(mode,
+                                session=self.http_session,
+                                cassette_dir=self.transport_options['cassette_dir'],
+                                fake_script=self.transport_options['fake_script'] or None,
+                                fake_url=self.transport_options['fake_url'] or None,
+                                replay_latency=replay_latency)
+    
     def load_config(self):
         """Load API configuration from config file"""
         config = configparser.ConfigParser()
@@ -136,6 +194,20 @@ class MultiAPIAssistant:
             self.api_keys['gemini'] = config.get('API', 'gemini_key', fallback='')
             self.api_keys['claude'] = config.get('API', 'claude_key', fallback='')
             self.selected_api = config.get('API', 'selected', fallback='openai')
+            self.capture_options['auto_trim'] = config.getboolean('Capture', 'auto_trim', fallback=False)
+            self.capture_options['window_crop'] = config.getboolean('Capture', 'window_crop', fallback=False)
+            self.capture_options['tiled'] = config.getboolean('Capture', 'tiled', fallback=False)
+            self.capture_options['tile_overview'] = config.getboolean('Capture', 'tile_overview', fallback=True)
+            self.capture_options['skip_unchanged_tiles'] = config.getboolean('Capture', 'skip_unchanged_tiles',
+                                                                             fallback=True)
+            try:
+                tile_size = config.getint('Capture', 'tile_size', fallback=TILE_SIZE)
+            except ValueError:
+                tile_size = TILE_SIZE
+            # A zero or negative tile size cannot split the desktop into tiles
+            self.capture_options['tile_size'] = tile_size if tile_size > 0 else TILE_SIZE
+            for key, default in self.transport_options.items():
+                self.transport_options[key] = config.get('Transport', key, fallback=default)
         else:
             # Create default config
             config['API'] = {
@@ -144,6 +216,15 @@ class MultiAPIAssistant:
                 'claude_key': '',
                 'selected': 'openai'
             }
+            config['Capture'] = {
+                'auto_trim': 'false',
+                'window_crop': 'false',
+                'tiled': 'false',
+                'tile_overview': 'true',
+                'skip_unchanged_tiles': 'true',
+                'tile_size': str(TILE_SIZE)
+            }
+            config['Transport'] = dict(self.transport_options)
             with open(config_file, 'w') as f:
                 config.write(f)
     
@@ -156,6 +237,15 @@ class MultiAPIAssistant:
             'claude_key': self.api_keys['claude'],
             'selected': self.selected_api
         }
+        config['Capture'] = {
+            'auto_trim': str(self.capture_options['auto_trim']).lower(),
+            'window_crop': str(self.capture_options['window_crop']).lower(),
+            'tiled': str(self.capture_options['tiled']).lower(),
+            'tile_overview': str(self.capture_options['tile_overview']).lower(),
+            'skip_unchanged_tiles': str(self.capture_options['skip_unchanged_tiles']).lower(),
+            'tile_size': str(self.capture_options['tile_size'])
+        }
+        config['Transport'] = dict(self.transport_options)
         with open('config.ini', 'w') as f:
             config.write(f)
     
@@ -304,6 +394,27 @@ class MultiAPIAssistant:
             btn = ModernButton(btn_frame, text=text, command=command)
             btn.grid(row=0, column=i, padx=(0, 10) if i < len(buttons)-1 else (0, 0))
         
+        # Capture tray controls
+        tray_frame = tk.Frame(screenshot_frame, bg=self.colors['bg_card'])
+        tray_frame.grid(row=2, column=0, pady=(0, 10))
+        
+        tray_buttons = [
+            ("➕ Add to Tray", self.add_to_tray),
+            ("🧹 Clear Tray", self.clear_tray)
+        ]
+        
+        for i, (text, command) in enumerate(tray_buttons):
+            btn = ModernButton(tray_frame, text=text, command=command)
+            btn.grid(row=0, column=i, padx=(0, 10))
+        
+        self.tray_var = tk.StringVar()
+        self.tray_var.set("Tray: empty")
+        tray_label = tk.Label(tray_frame, textvariable=self.tray_var,
+                             font=('Segoe UI', 9),
+                             fg=self.colors['text_secondary'],
+                             bg=self.colors['bg_card'])
+        tray_label.grid(row=0, column=len(tray_buttons))
+        
         # Screenshot preview with modern styling
         preview_frame = tk.Frame(screenshot_frame, bg=self.colors['bg_input'], relief='flat', bd=0)
         preview_frame.grid(row=1, column=0, pady=15, sticky=(tk.W, tk.E))
@@ -317,6 +428,43 @@ class MultiAPIAssistant:
                                      justify='center')
         self.preview_label.pack(pady=20)
         
+        # Pre-upload trimming options
+        trim_frame = tk.Frame(screenshot_frame, bg=self.colors['bg_card'])
+        trim_frame.grid(row=3, column=0, sticky=tk.W)
+        
+        self.auto_trim_var = tk.BooleanVar(value=self.capture_options['auto_trim'])
+        self.window_crop_var = tk.BooleanVar(value=self.capture_options['window_crop'])
+        self.tiled_var = tk.BooleanVar(value=self.capture_options['tiled'])
+        self.tile_overview_var = tk.BooleanVar(value=self.capture_options['tile_overview'])
+        
+        trim_options = [
+            ("✂️ Trim borders and empty space before upload", self.auto_trim_var),
+            ("🪟 Crop full-screen captures to the focused window", self.window_crop_var),
+            ("🧩 Tiled full-screen capture for large or multi-monitor desktops", self.tiled_var),
+            ("🗺️ Send a low-res overview with the detail tiles", self.tile_overview_var)
+        ]
+        
+        for i, (text, variable) in enumerate(trim_options):
+            check_btn = tk.Checkbutton(trim_frame,
+                                      text=text,
+                                      variable=variable,
+                                      command=self.on_capture_option_change,
+                                      font=('Segoe UI', 9),
+                                      fg=self.colors['text_primary'],
+                                      bg=self.colors['bg_card'],
+                                      selectcolor=self.colors['bg_card'],
+                                      activebackground=self.colors['bg_card'],
+                                      activeforeground=self.colors['primary'])
+            check_btn.grid(row=i, column=0, sticky=tk.W)
+        
+        self.crop_var = tk.StringVar()
+        crop_label = tk.Label(trim_frame, textvariable=self.crop_var,
+                             font=('Segoe UI', 9),
+                             fg=self.colors['text_secondary'],
+                             bg=self.colors['bg_card'],
+                             justify='left')
+        crop_label.grid(row=len(trim_options), column=0, sticky=tk.W, pady=(5, 0))
+        
         # Question Card
         question_frame = self.create_card_frame(main_frame, "❓ Ask AI", 4)
         
@@ -377,6 +525,19 @@ class MultiAPIAssistant:
         """Handle API selection change"""
         self.selected_api = self.api_var.get()
         self.save_config()
+        self._start_speculative_upload()
+    
+    def on_capture_option_change(self):
+        """Handle trimming and tiling option changes and refresh the preview crop"""
+        self.capture_options['auto_trim'] = self.auto_trim_var.get()
+        self.capture_options['window_crop'] = self.window_crop_var.get()
+        self.capture_options['tiled'] = self.tiled_var.get()
+        self.capture_options['tile_overview'] = self.tile_overview_var.get()
+        self.save_config()
+        
+        if self.current_screenshot:
+            self.update_preview(self.current_screenshot)
+            self._start_speculative_upload()
         
     def save_api_keys(self):
         """Save all API keys"""
@@ -391,27 +552,110 @@ class MultiAPIAssistant:
     
     def capture_full_screen(self):
         """Capture the entire screen"""
+        if self.capture_options['tiled']:
+            self.capture_tiled()
+            return
+        
         try:
             self.status_var.set("📸 Capturing full screen...")
             self.root.update()
             
+            # Remember the focused window so the upload can be cropped to it
+            self.capture_window_rect = None
+            if self.capture_options['window_crop']:
+                own_hwnd = self.root.wm_frame()
+                self.capture_window_rect = find_focused_window_rect(int(own_hwnd, 16))
+            
             # Capture screenshot
             screenshot = ImageGrab.grab()
+            self._begin_capture()
             self.current_screenshot = screenshot
             
-            # Save screenshot
+            # Archive, preview and upload variants are encoded in parallel
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             self.screenshot_path = f"screenshot_{timestamp}.png"
-            screenshot.save(self.screenshot_path)
-            
-            # Update preview
+            self._archive_screenshot(screenshot, self.screenshot_path,
+                                     f"✅ Screenshot saved: {self.screenshot_path}")
             self.update_preview(screenshot)
-            self.status_var.set(f"✅ Screenshot saved: {self.screenshot_path}")
+            self._start_speculative_upload()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to capture screenshot: {str(e)}")
             self.status_var.set("❌ Screenshot capture failed")
     
+    def capture_tiled(self):
+        """Capture the desktop tile by tile on a worker thread; the window stays responsive"""
+        if self.tiled_capture_running:
+            self.status_var.set("🧩 Tiled capture already in progress...")
+            return
+        
+        # Unchanged tiles keep the image object already queued for sending
+        retained = [image for image, _ in self.tiled_images + self.capture_tray]
+        generation = self._begin_capture()
+        self.tiled_capture_running = True
+        self.status_var.set("🧩 Capturing tiles...")
+        
+        threading.Thread(target=self._run_tiled_capture,
+                         args=(generation,
+                               (self.root.winfo_screenwidth(), self.root.winfo_screenheight()),
+                               self.capture_options['skip_unchanged_tiles'],
+                               retained),
+                         daemon=True).start()
+    
+    def _run_tiled_capture(self, generation, fallback_size, skip_unchanged, retained):
+        """Grab, downscale and analyse the tiles off the UI thread"""
+        try:
+            result = self.tiled_capture.capture(fallback_size=fallback_size, skip_unchanged=skip_unchanged,
+                                                retained=retained)
+        except Exception as e:
+            error_msg = f"Failed to capture tiles: {str(e)}"
+            self.root.after(0, lambda: self._on_tiled_capture_failed(generation, error_msg))
+            return
+        self.root.after(0, lambda: self._on_tiled_capture(generation, result))
+    
+    def _on_tiled_capture_failed(self, generation, error_msg):
+        self.tiled_capture_running = False
+        if generation != self.capture_generation:
+            return
+        messagebox.showerror("Error", error_msg)
+        self.status_var.set("❌ Tiled capture failed")
+    
+    def _on_tiled_capture(self, generation, result):
+        """Show a finished tiled capture and make its overview and tiles the next request"""
+        self.tiled_capture_running = False
+        if generation != self.capture_generation:
+            # Another capture was taken while the tiles were grabbed
+            return
+        
+        try:
+            detail_tiles = result.detail_tiles
+            blank_count = sum(1 for tile in result.tiles if tile.blank)
+            reused_count = sum(1 for tile in result.tiles if tile.reused)
+            
+            # The overview stands in for the desktop in the preview, with the detail tiles outlined
+            self.current_screenshot = result.overview
+            self.capture_window_rect = None
+            self.current_tile_boxes = [result.to_overview_box(tile.rect) for tile in detail_tiles]
+            
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.screenshot_path = f"screenshot_tiled_{timestamp}.png"
+            self._archive_screenshot(result.overview, self.screenshot_path,
+                                     f"✅ Tiled capture saved: {self.screenshot_path} - "
+                                     f"{len(detail_tiles)} of {len(result.tiles)} tiles kept, "
+                                     f"{blank_count} blank, {reused_count} unchanged")
+            self.update_preview(result.overview)
+            
+            # The overview and tiles are sent together until the next capture replaces them
+            self.tiled_images = []
+            if self.capture_options['tile_overview'] or not detail_tiles:
+                self.tiled_images.append((result.overview, self.current_crop))
+            self.tiled_images.extend((tile.image, None) for tile in detail_tiles)
+            self._start_speculative_upload()
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to capture tiles: {str(e)}")
+            self.status_var.set("❌ Tiled capture failed")
+    
     def capture_area(self):
         """Capture a selected area of the screen"""
         self.root.iconify()  # Minimize main window
@@ -419,26 +663,27 @@ class MultiAPIAssistant:
     
     def _start_area_capture(self):
         """Start the area capture process"""
+        # The selector restores the main window once the region has been grabbed or cancelled
         try:
             self.area_selector.select_area()
         except Exception as e:
+            self.root.deiconify()
             messagebox.showerror("Error", f"Area capture failed: {str(e)}")
-        finally:
-            self.root.deiconify()  # Restore main window
     
     def on_area_selected(self, cropped_image):
         """Callback when area selection is complete"""
         try:
+            self._begin_capture()
             self.current_screenshot = cropped_image
+            self.capture_window_rect = None
             
-            # Save screenshot
+            # Archive, preview and upload variants are encoded in parallel
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             self.screenshot_path = f"screenshot_area_{timestamp}.png"
-            cropped_image.save(self.screenshot_path)
-            
-            # Update preview
+            self._archive_screenshot(cropped_image, self.screenshot_path,
+                                     f"✅ Area screenshot saved: {self.screenshot_path}")
             self.update_preview(cropped_image)
-            self.status_var.set(f"✅ Area screenshot saved: {self.screenshot_path}")
+            self._start_speculative_upload()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to process area selection: {str(e)}")
@@ -454,36 +699,162 @@ class MultiAPIAssistant:
         if file_path:
             try:
                 image = Image.open(file_path)
+                self._share_current(image)
+                self._begin_capture()
                 self.current_screenshot = image
                 self.screenshot_path = file_path
+                self.capture_window_rect = None
                 self.update_preview(image)
+                self._start_speculative_upload()
                 self.status_var.set(f"✅ Image loaded: {os.path.basename(file_path)}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load image: {str(e)}")
     
+    def _begin_capture(self):
+        """Start a new capture: it replaces the previous tiled request set and any tiling in flight"""
+        self.capture_generation += 1
+        self.tiled_images = []
+        self.current_tile_boxes = []
+        return self.capture_generation
+    
+    def _share_current(self, image):
+        """Keep the current capture in shared memory for as long as it is current"""
+        shared = self.encoding_service.share(image)
+        if self.current_shared is not None:
+            self.encoding_service.release(self.current_shared)
+        self.current_shared = shared
+        return shared
+    
+    def _archive_screenshot(self, image, path, message):
+        """Save the archived copy on the encoding pool and report when it is written"""
+        future = self.encoding_service.save(self._share_current(image), path)
+        
+        def on_saved(future):
+            error = future.exception()
+            if error:
+                self.root.after(0, lambda: self.status_var.set(f"❌ Failed to save screenshot: {str(error)}"))
+            else:
+                self.root.after(0, lambda: self.status_var.set(message))
+        
+        self.status_var.set("💾 Saving screenshot...")
+        future.add_done_callback(on_saved)
+    
+    def add_to_tray(self):
+        """Add the current screenshot, or the whole tiled capture, to the capture tray"""
+        if not self.current_screenshot:
+            messagebox.showerror("Error", "Please capture or load an image first!")
+            return
+        
+        if self.tiled_images:
+            # Unchanged tiles from an earlier tiled capture may already be in the tray
+            in_tray = {id(image) for image, _ in self.capture_tray}
+            self.capture_tray.extend(entry for entry in self.tiled_images if id(entry[0]) not in in_tray)
+        else:
+            self.capture_tray.append((self.current_screenshot, self.current_crop))
+        self.tray_var.set(f"Tray: {len(self.capture_tray)} image(s)")
+        self._start_speculative_upload()
+        self.status_var.set(f"✅ Added to tray ({len(self.capture_tray)} image(s) will be sent together)")
+    
+    def clear_tray(self):
+        """Remove all images from the capture tray"""
+        self.capture_tray = []
+        self.tray_var.set("Tray: empty")
+        self._start_speculative_upload()
+        self.status_var.set("✨ Tray cleared - questions will use the current screenshot")
+    
+    def _get_request_images(self):
+        """(image, crop box) pairs to send: the whole tray if filled, otherwise the current capture"""
+        if self.capture_tray:
+            return list(self.capture_tray)
+        if self.tiled_images:
+            return list(self.tiled_images)
+        return [(self.current_screenshot, self.current_crop)] if self.current_screenshot else []
+    
+    def _start_speculative_upload(self):
+        """Encode the next request and warm up the provider connection in the background"""
+        images = self._get_request_images()
+        if not images:
+            self.speculative_upload.cancel()
+            return
+        
+        # Prepare a variant for every configured provider so switching stays instant,
+        # queueing the selected provider first
+        provider = self.selected_api
+        byte_budgets = {provider: UPLOAD_BYTE_BUDGETS.get(provider, DEFAULT_BYTE_BUDGET)}
+        for name in self.api_keys:
+            if name != provider and self.api_keys[name]:
+                byte_budgets[name] = UPLOAD_BYTE_BUDGETS.get(name, DEFAULT_BYTE_BUDGET)
+        warm_up = None
+        if self.api_keys.get(provider) or self.transport.offline:
+            warm_up = lambda: self.transport.warm_up(provider)
+        self.speculative_upload.schedule(images, byte_budgets, warm_up)
+    
+    def _update_upload_crop(self, image):
+        """Work out the pre-upload crop for image and describe it below the preview"""
+        self.current_crop = None
+        width, height = image.size
+        
+        if self.capture_options['auto_trim'] or self.capture_window_rect:
+            start = time.perf_counter()
+            try:
+                self.current_crop = compute_crop_box(image,
+                                                     trim=self.capture_options['auto_trim'],
+                                                     window_rect=self.capture_window_rect)
+            except Exception as e:
+                self.crop_var.set(f"⚠️ Trimming failed, uploading full image: {str(e)}")
+                return
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            
+            if self.current_crop:
+                left, top, right, bottom = self.current_crop
+                before = width * height
+                after = (right - left) * (bottom - top)
+                self.crop_var.set(f"Upload crop ({left}, {top})-({right}, {bottom}): "
+                                  f"{width}x{height} → {right - left}x{bottom - top}, "
+                                  f"{before:,} → {after:,} px ({after * 100 // before}%) in {elapsed_ms:.0f} ms")
+                return
+        
+        self.crop_var.set(f"Upload: full image {width}x{height}, {width * height:,} px")
+    
     def update_preview(self, image):
         """Update the preview with the captured image - preserving aspect ratio"""
-        # Create a copy to avoid modifying the original
-        preview_image = image.copy()
-        
-        # Calculate aspect ratio preserving resize
         preview_width = 200
         preview_height = 150
         
-        # Get original dimensions
-        orig_width, orig_height = preview_image.size
+        # Resize on the preview worker while the crop is analysed here
+        shared = self.encoding_service.share(image)
+        try:
+            thumbnail_future = self.encoding_service.thumbnail(shared, (preview_width, preview_height))
+        finally:
+            self.encoding_service.release(shared)
+        self._update_upload_crop(image)
+        
+        # Finish on the Tk thread once the thumbnail is ready; newer previews win
+        self.preview_generation += 1
+        generation = self.preview_generation
+        outlines = (list(self.current_tile_boxes), self.current_crop)
+        
+        def on_thumbnail(future):
+            if future.exception():
+                error = future.exception()
+                self.root.after(0, lambda: self.status_var.set(f"❌ Preview failed: {str(error)}"))
+            else:
+                self.root.after(0, lambda: self._show_preview(generation, future.result(), outlines))
         
-        # Calculate scaling factor to fit within preview area
-        scale_x = preview_width / orig_width
-        scale_y = preview_height / orig_height
-        scale = min(scale_x, scale_y)  # Use the smaller scale to fit both dimensions
+        thumbnail_future.add_done_callback(on_thumbnail)
+    
+    def _show_preview(self, generation, thumbnail, outlines):
+        """Draw a finished thumbnail with its tile and crop outlines"""
+        if generation != self.preview_generation:
+            return
         
-        # Calculate new dimensions
-        new_width = int(orig_width * scale)
-        new_height = int(orig_height * scale)
+        preview_width = 200
+        preview_height = 150
+        tile_boxes, crop = outlines
         
-        # Resize image preserving aspect ratio
-        preview_image = preview_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        # Aspect-ratio preserving thumbnail and the scale it was resized by
+        thumbnail_data, (new_width, new_height), scale = thumbnail
+        preview_image = Image.frombytes('RGB', (new_width, new_height), thumbnail_data)
         
         # Create a background canvas with the preview size
         background = Image.new('RGB', (preview_width, preview_height), self.colors['bg_input'])
@@ -495,6 +866,18 @@ class MultiAPIAssistant:
         # Paste the resized image onto the background
         background.paste(preview_image, (x_offset, y_offset))
         
+        # Outline the detail tiles and the region that will actually be uploaded
+        draw = ImageDraw.Draw(background)
+        for left, top, right, bottom in tile_boxes:
+            draw.rectangle((x_offset + int(left * scale), y_offset + int(top * scale),
+                            x_offset + int(right * scale) - 1, y_offset + int(bottom * scale) - 1),
+                           outline=self.colors['success'], width=1)
+        if crop:
+            left, top, right, bottom = crop
+            draw.rectangle((x_offset + int(left * scale), y_offset + int(top * scale),
+                            x_offset + int(right * scale) - 1, y_offset + int(bottom * scale) - 1),
+                           outline=self.colors['warning'], width=2)
+        
         # Convert to PhotoImage
         photo = ImageTk.PhotoImage(background)
         
@@ -504,11 +887,12 @@ class MultiAPIAssistant:
     
     def ask_ai(self):
         """Send screenshot and question to selected AI service"""
-        if not self.api_keys[self.selected_api]:
+        if not self.api_keys[self.selected_api] and not self.transport.offline:
             messagebox.showerror("Error", f"Please enter your {self.selected_api.title()} API key first!")
             return
         
-        if not self.current_screenshot:
+        images = self._get_request_images()
+        if not images:
             messagebox.showerror("Error", "Please capture or load an image first!")
             return
         
@@ -518,166 +902,57 @@ class MultiAPIAssistant:
             return
         
         # Run API call in separate thread to avoid blocking UI
-        threading.Thread(target=self._send_to_ai, args=(question,), daemon=True).start()
+        threading.Thread(target=self._send_to_ai, args=(question, images), daemon=True).start()
     
-    def _send_to_ai(self, question):
+    def _send_to_ai(self, question, images):
         """Send request to selected AI service"""
         try:
             self.status_var.set(f"🤖 Sending to {self.selected_api.title()}...")
             self.root.update()
             
-            if self.selected_api == 'openai':
-                response_text = self._send_to_openai(question)
-            elif self.selected_api == 'gemini':
-                response_text = self._send_to_gemini(question)
-            elif self.selected_api == 'claude':
-                response_text = self._send_to_claude(question)
-            else:
-                raise ValueError(f"Unknown API: {self.selected_api}")
+            start = time.perf_counter()
+            captured_pixels = sum(image.size[0] * image.size[1] for image, _ in images)
+            byte_budget = UPLOAD_BYTE_BUDGETS.get(self.selected_api, DEFAULT_BYTE_BUDGET)
+            
+            # Reuse the speculative encoding when it matches, otherwise encode now
+            encoded_images, pre_encoded = self.speculative_upload.take_or_prepare(images, self.selected_api,
+                                                                                  byte_budget)
+            uploaded_pixels = sum(image.size[0] * image.size[1] for image in encoded_images)
+            prepare_elapsed = time.perf_counter() - start
+            
+            payload_bytes = sum(image.nbytes for image in encoded_images)
+            # Untrimmed baseline, measured on the encoding pool while the request is in flight
+            untrimmed_futures = self.image_encoder.encode_untrimmed(images, encoded_images)
+            
+            response_text = send_request(self.transport, self.selected_api, question, encoded_images,
+                                         self.api_keys.get(self.selected_api, ''))
             
             # Update UI in main thread
             self.root.after(0, lambda: self._update_response(response_text))
-            self.root.after(0, lambda: self.status_var.set("✅ Response received"))
+            elapsed = time.perf_counter() - start
+            status = (f"✅ Response received in {elapsed:.1f}s "
+                      f"(prepare {prepare_elapsed * 1000:.0f} ms{', pre-encoded' if pre_encoded else ''}) - "
+                      f"uploaded {uploaded_pixels:,} of {captured_pixels:,} captured px, "
+                      f"{payload_bytes / 1024:,.0f} KB")
+            untrimmed_bytes = self._measure_untrimmed(untrimmed_futures, encoded_images)
+            if untrimmed_bytes and untrimmed_bytes > payload_bytes:
+                status += f" ({untrimmed_bytes / 1024:,.0f} KB untrimmed)"
+            self.root.after(0, lambda: self.status_var.set(status))
                 
         except Exception as e:
             error_msg = f"Request failed: {str(e)}"
             self.root.after(0, lambda: messagebox.showerror("Error", error_msg))
             self.root.after(0, lambda: self.status_var.set("❌ Request failed"))
     
-    def _send_to_openai(self, question):
-        """Send request to OpenAI API"""
-        # Convert image to base64 with proper error handling
+    def _measure_untrimmed(self, untrimmed_futures, encoded_images):
+        """Payload size had nothing been trimmed, or None if it could not be measured"""
+        if not any(untrimmed_futures):
+            return None
         try:
-            img_buffer = io.BytesIO()
-            self.current_screenshot.save(img_buffer, format='PNG')
-            img_buffer.seek(0)  # Reset buffer position
-            img_str = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
-        except Exception as e:
-            raise Exception(f"Failed to encode image: {str(e)}")
-        
-        # Prepare API request
-        headers = {
-            "Authorization": f"Bearer {self.api_keys['openai']}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "gpt-4-vision-preview",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": question
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{img_str}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            "max_tokens": 1000
-        }
-        
-        # Send request
-        response = requests.post("https://api.openai.com/v1/chat/completions", 
-                               headers=headers, json=data, timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result['choices'][0]['message']['content']
-        else:
-            raise Exception(f"OpenAI API Error: {response.status_code} - {response.text}")
-    
-    def _send_to_gemini(self, question):
-        """Send request to Gemini API - Fixed blob issue"""
-        if not GEMINI_AVAILABLE:
-            raise Exception("Gemini library not installed. Run: pip install google-generativeai")
-        
-        try:
-            # Configure Gemini
-            genai.configure(api_key=self.api_keys['gemini'])
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            
-            # Convert image to bytes with proper error handling
-            img_buffer = io.BytesIO()
-            self.current_screenshot.save(img_buffer, format='PNG')
-            img_buffer.seek(0)  # Reset buffer position
-            img_data = img_buffer.getvalue()
-            
-            # Create PIL Image object for Gemini (this fixes the blob issue)
-            from PIL import Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            
-            # Send request with PIL Image instead of raw bytes
-            response = model.generate_content([question, pil_image])
-            
-            if response.text:
-                return response.text
-            else:
-                raise Exception("Empty response from Gemini")
-                
-        except Exception as e:
-            raise Exception(f"Gemini API Error: {str(e)}")
-    
-    def _send_to_claude(self, question):
-        """Send request to Claude API"""
-        if not CLAUDE_AVAILABLE:
-            raise Exception("Claude library not installed. Run: pip install anthropic")
-        
-        try:
-            # Convert image to base64 with proper error handling
-            img_buffer = io.BytesIO()
-            self.current_screenshot.save(img_buffer, format='PNG')
-            img_buffer.seek(0)  # Reset buffer position
-            img_str = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
-        except Exception as e:
-            raise Exception(f"Failed to encode image: {str(e)}")
-        
-        # Prepare API request
-        headers = {
-            "x-api-key": self.api_keys['claude'],
-            "Content-Type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
-        
-        data = {
-            "model": "claude-3-sonnet-20240229",
-            "max_tokens": 1000,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": question
-                        },
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/png",
-                                "data": img_str
-                            }
-                        }
-                    ]
-                }
-            ]
-        }
-        
-        # Send request
-        response = requests.post("https://api.anthropic.com/v1/messages", 
-                               headers=headers, json=data, timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result['content'][0]['text']
-        else:
-            raise Exception(f"Claude API Error: {response.status_code} - {response.text}")
+            return sum(len(future.result(timeout=10)[0]) if future else item.nbytes
+                       for future, item in zip(untrimmed_futures, encoded_images))
+        except Exception:
+            return None
     
     def _update_response(self, response_text):
         """Update the response text widget with modern formatting"""
@@ -695,6 +970,10 @@ class MultiAPIAssistant:
     def run(self):
         """Start the application"""
         self.root.mainloop()
+        self.speculative_upload.shutdown()
+        self.encoding_service.shutdown()
+        if getattr(self.transport, 'server', None):
+            self.transport.server.stop()
 
 if __name__ == "__main__":
     app = MultiAPIAssistant()
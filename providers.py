@@ -0,0 +1,170 @@
+import json
+
+# Endpoint path of each provider's API, relative to its base URL
+PROVIDER_PATHS = {
+    'openai': "/v1/chat/completions",
+    'gemini': "/v1beta/models/gemini-2.5-flash:generateContent",
+    'claude': "/v1/messages"
+}
+
+
+def _build_openai(question, encoded_images, api_key):
+    content = [
+        {
+            "type": "text",
+            "text": question
+        }
+    ]
+    for image in encoded_images:
+        content.append({
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:{image.media_type};base64,{image.b64}"
+            }
+        })
+
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+    data = {
+        "model": "gpt-4-vision-preview",
+        "messages": [
+            {
+                "role": "user",
+                "content": content
+            }
+        ],
+        "max_tokens": 1000
+    }
+    return headers, data
+
+
+def _build_gemini(question, encoded_images, api_key):
+    parts = [
+        {
+            "text": question
+        }
+    ]
+    for image in encoded_images:
+        parts.append({
+            "inline_data": {
+                "mime_type": image.media_type,
+                "data": image.b64
+            }
+        })
+
+    headers = {
+        "x-goog-api-key": api_key,
+        "Content-Type": "application/json"
+    }
+
+    data = {
+        "contents": [
+            {
+                "role": "user",
+                "parts": parts
+            }
+        ]
+    }
+    return headers, data
+
+
+def _build_claude(question, encoded_images, api_key):
+    # Images go first, labelled when there is more than one
+    content = []
+    for i, image in enumerate(encoded_images, 1):
+        if len(encoded_images) > 1:
+            content.append({
+                "type": "text",
+                "text": f"Image {i}:"
+            })
+        content.append({
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": image.media_type,
+                "data": image.b64
+            }
+        })
+    content.append({
+        "type": "text",
+        "text": question
+    })
+
+    headers = {
+        "x-api-key": api_key,
+        "Content-Type": "application/json",
+        "anthropic-version": "2023-06-01"
+    }
+
+    data = {
+        "model": "claude-3-sonnet-20240229",
+        "max_tokens": 1000,
+        "messages": [
+            {
+                "role": "user",
+                "content": content
+            }
+        ]
+    }
+    return headers, data
+
+
+def _parse_openai(result):
+    return result['choices'][0]['message']['content']
+
+
+def _parse_gemini(result):
+    candidates = result.get('candidates') or []
+    if not candidates:
+        # The whole prompt was rejected, e.g. by the safety filters
+        reason = result.get('promptFeedback', {}).get('blockReason', 'no candidates returned')
+        raise Exception(f"Gemini API Error: Response blocked ({reason})")
+
+    candidate = candidates[0]
+    if 'content' not in candidate:
+        # The answer was withheld, e.g. finishReason SAFETY or RECITATION
+        reason = candidate.get('finishReason', 'no content returned')
+        raise Exception(f"Gemini API Error: Response blocked ({reason})")
+
+    text = "".join(part.get('text', '') for part in candidate['content'].get('parts', []))
+    if text:
+        return text
+    raise Exception("Gemini API Error: Empty response from Gemini")
+
+
+def _parse_claude(result):
+    return result['content'][0]['text']
+
+
+_BUILDERS = {'openai': _build_openai, 'gemini': _build_gemini, 'claude': _build_claude}
+_PARSERS = {'openai': _parse_openai, 'gemini': _parse_gemini, 'claude': _parse_claude}
+_NAMES = {'openai': "OpenAI", 'gemini': "Gemini", 'claude': "Claude"}
+
+
+def build_request(provider, question, encoded_images, api_key):
+    """Return (path, headers, body) of the request asking provider about encoded_images"""
+    if provider not in _BUILDERS:
+        raise ValueError(f"Unknown API: {provider}")
+    headers, data = _BUILDERS[provider](question, encoded_images, api_key)
+    return PROVIDER_PATHS[provider], headers, data
+
+
+def parse_response(provider, response):
+    """Answer text from a provider response, raising on API errors and blocked answers"""
+    if response.status_code != 200:
+        raise Exception(f"{_NAMES[provider]} API Error: {response.status_code} - {response.text}")
+    try:
+        result = response.json()
+    except json.JSONDecodeError:
+        raise Exception(f"{_NAMES[provider]} API Error: Invalid JSON response - {response.text[:200]}")
+    return _PARSERS[provider](result)
+
+
+def send_request(transport, provider, question, encoded_images, api_key, timeout=30):
+    """Ask provider about encoded_images through transport and return the answer text"""
+    path, headers, data = build_request(provider, question, encoded_images, api_key)
+    response = transport.post(provider, path, headers, data, timeout=timeout)
+    return parse_response(provider, response)
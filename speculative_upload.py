@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SpeculativeUploader:
+    """Prepares the next upload in the background as soon as an image is captured"""
+    def __init__(self, encoder):
+        self.encoder = encoder
+        # Threads only coordinate; the encoding itself runs on the encoder's process pool
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='speculative-upload')
+        self.lock = threading.Lock()
+        self.pending = None
+
+    @staticmethod
+    def _make_key(images):
+        # Images are compared by identity; comparing PIL images would compare pixels
+        return tuple((id(image), crop) for image, crop in images)
+
+    def schedule(self, images, byte_budgets, warm_up=None):
+        """Start encoding images for each provider's byte budget, cancelling any outdated work
+
+        byte_budgets is ordered with the selected provider first, so its
+        variant is queued ahead of the others.
+        """
+        key = self._make_key(images)
+        with self.lock:
+            if self.pending and self.pending['key'] == key and self.pending['byte_budgets'] == byte_budgets:
+                return
+            self._cancel_pending()
+
+            cancel_event = threading.Event()
+            images = list(images)
+            base_future = self.executor.submit(self.encoder.encode_base, images, cancel_event)
+            # One future per provider so a request only waits for its own variant
+            futures = {provider: self.executor.submit(self._fit, images, base_future, byte_budget, cancel_event)
+                       for provider, byte_budget in byte_budgets.items()}
+            # Hold on to the images so their ids stay valid for the key
+            self.pending = {
+                'key': key,
+                'byte_budgets': dict(byte_budgets),
+                'images': images,
+                'futures': [base_future] + list(futures.values()),
+                'provider_futures': futures,
+                'cancel_event': cancel_event
+            }
+
+        if warm_up:
+            threading.Thread(target=self._run_warm_up, args=(warm_up,), daemon=True).start()
+
+    def _fit(self, images, base_future, byte_budget, cancel_event):
+        """Fit the shared full-size encoding to one provider's budget"""
+        return self.encoder.fit_budget(images, base_future.result(), byte_budget, cancel_event)
+
+    def _run_warm_up(self, warm_up):
+        """Open the provider connection early; failures are retried by the real request"""
+        try:
+            warm_up()
+        except Exception:
+            pass
+
+    def take(self, images, provider, byte_budget):
+        """Return the speculative encoding for this exact request, or None if there is none"""
+        key = self._make_key(images)
+        with self.lock:
+            if (not self.pending or self.pending['key'] != key
+                    or self.pending['byte_budgets'].get(provider) != byte_budget):
+                return None
+            future = self.pending['provider_futures'][provider]
+
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def take_or_prepare(self, images, provider, byte_budget):
+        """Return (encoded images, pre_encoded), encoding now if nothing was prepared for this request"""
+        encoded = self.take(images, provider, byte_budget)
+        if encoded is not None:
+            return encoded, True
+        return self.encoder.prepare(images, byte_budget), False
+
+    def _cancel_pending(self):
+        """Cancel queued work and signal running work to stop (caller holds the lock)"""
+        if self.pending:
+            self.pending['cancel_event'].set()
+            for future in self.pending['futures']:
+                future.cancel()
+            self.pending = None
+
+    def cancel(self):
+        """Drop any speculative work"""
+        with self.lock:
+            self._cancel_pending()
+
+    def shutdown(self):
+        """Stop the background worker"""
+        self.cancel()
+        self.executor.shutdown(wait=False)
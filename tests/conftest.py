@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoding_service import EncodingService  # noqa: E402
+from fake_provider import FakeProviderServer  # noqa: E402
+from image_encoder import EncodedImage  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def encoding_service():
+    service = EncodingService(max_workers=2)
+    yield service
+    service.shutdown()
+
+
+@pytest.fixture
+def encoded_images():
+    # Long enough that recording replaces the base64 data with a digest
+    return [EncodedImage(b'\x89PNG' + bytes(range(256)) * 4, (640, 480)),
+            EncodedImage(b'\x89PNG' + bytes(range(255, -1, -1)) * 4, (320, 240))]
+
+
+@pytest.fixture
+def fake_server():
+    """Start a FakeProviderServer with an optional script; stopped after the test"""
+    servers = []
+
+    def start(script=None):
+        server = FakeProviderServer(script=script)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
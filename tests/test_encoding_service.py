@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from PIL import Image
+
+from encoding_service import EncodingService
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_share_reuses_block_until_released(encoding_service):
+    image = Image.new('RGB', (64, 48), 'red')
+
+    first = encoding_service.share(image)
+    second = encoding_service.share(image)
+    assert first is second and first.refs == 2
+
+    encoding_service.release(first)
+    encoding_service.release(second)
+    assert id(image) not in encoding_service.shared
+
+
+def test_encode_png_keeps_image_shared_until_done(encoding_service):
+    image = Image.new('RGB', (200, 100), 'blue')
+    shared = encoding_service.share(image)
+    future = encoding_service.encode_png(shared, (0, 0, 100, 100), 0.5)
+    encoding_service.release(shared)
+
+    data, size = future.result()
+
+    assert size == (50, 50) and data.startswith(b'\x89PNG')
+
+
+def test_thumbnail_fits_box(encoding_service):
+    shared = encoding_service.share(Image.new('RGB', (400, 100)))
+    try:
+        data, size, scale = encoding_service.thumbnail(shared, (200, 200)).result()
+    finally:
+        encoding_service.release(shared)
+
+    assert size == (200, 50) and scale == 0.5 and len(data) == 200 * 50 * 3
+
+
+def test_at_least_two_workers():
+    service = EncodingService()
+    try:
+        assert service.max_workers >= 2
+    finally:
+        service.shutdown()
+
+
+def test_workers_leave_shared_memory_tracking_to_the_parent():
+    # The resource tracker is a separate process, so look at what it prints
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {ROOT!r})
+        from PIL import Image
+        from encoding_service import EncodingService
+
+        if __name__ == '__main__':
+            service = EncodingService(max_workers=2)
+            for _ in range(3):
+                shared = service.share(Image.new('RGB', (64, 64)))
+                service.encode_png(shared).result()
+                service.release(shared)
+            service.shutdown()
+    """)
+
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert 'KeyError' not in result.stderr
+    assert 'leaked' not in result.stderr
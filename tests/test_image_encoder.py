@@ -0,0 +1,138 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_encoder import MIN_EDGE, UPLOAD_BYTE_BUDGETS, UPLOAD_LIMITS, ImageEncoder, upload_budget
+
+
+def _noise(width, height, seed=0):
+    # Random pixels barely compress, so encoded size tracks pixel count
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+class CountingService:
+    """Wraps the encoding service and counts encodes per source image size"""
+    def __init__(self, service):
+        self.service = service
+        self.encodes = {}
+
+    def encode_png(self, shared, crop=None, scale=1.0):
+        self.encodes[shared.size] = self.encodes.get(shared.size, 0) + 1
+        return self.service.encode_png(shared, crop, scale)
+
+    def __getattr__(self, name):
+        return getattr(self.service, name)
+
+
+def test_prepare_keeps_full_size_under_budget(encoding_service):
+    images = [(_noise(300, 200), None), (_noise(400, 300, seed=1), (0, 0, 200, 100))]
+
+    encoded = ImageEncoder(encoding_service).prepare(images, byte_budget=(10 * 1024 * 1024, 10 * 1024 * 1024))
+
+    assert [item.size for item in encoded] == [(300, 200), (200, 100)]
+    assert all(item.data.startswith(b'\x89PNG') for item in encoded)
+
+
+def test_fit_budget_shrinks_only_images_over_their_share(encoding_service):
+    encoder = ImageEncoder(encoding_service)
+    images = [(_noise(300, 300), None), (_noise(1200, 1200, seed=1), None)]
+    base = encoder.encode_base(images)
+    budget = (base[0].nbytes + base[1].nbytes // 3, base[1].nbytes)
+
+    fitted = encoder.fit_budget(images, base, budget)
+
+    assert fitted[0] is base[0]
+    assert fitted[1].size[0] < 1200
+    assert sum(item.nbytes for item in fitted) <= budget[0]
+
+
+def test_fit_budget_returns_base_when_it_fits(encoding_service):
+    encoder = ImageEncoder(encoding_service)
+    images = [(_noise(300, 300), None)]
+    base = encoder.encode_base(images)
+
+    assert encoder.fit_budget(images, base, (base[0].nbytes, base[0].nbytes)) is base
+
+
+def test_images_at_min_edge_are_not_reencoded(encoding_service):
+    counting = CountingService(encoding_service)
+    encoder = ImageEncoder(counting)
+    small = _noise(MIN_EDGE, MIN_EDGE)
+    images = [(small, None), (_noise(1200, 1200, seed=1), None)]
+    base = encoder.encode_base(images)
+    # The small image is over an even split but cannot shrink, so the large one absorbs the cut
+    budget = (base[0].nbytes * 3, base[1].nbytes)
+
+    fitted = encoder.fit_budget(images, base, budget)
+
+    assert fitted[0] is base[0]
+    assert sum(item.nbytes for item in fitted) <= budget[0]
+    assert sorted(counting.encodes.values()) == [1, 2]
+
+
+def test_images_that_cannot_shrink_fail_without_retrying(encoding_service):
+    counting = CountingService(encoding_service)
+    encoder = ImageEncoder(counting)
+    images = [(_noise(200, 200), None), (_noise(MIN_EDGE, MIN_EDGE, seed=1), None)]
+
+    with pytest.raises(Exception, match="Images too large to send"):
+        encoder.prepare(images, byte_budget=(1024, 1024))
+
+    assert list(counting.encodes.values()) == [1, 1]
+
+
+def test_per_image_cap_shrinks_only_the_oversized_image(encoding_service):
+    encoder = ImageEncoder(encoding_service)
+    images = [(_noise(400, 400), None), (_noise(1000, 1000, seed=1), None), (_noise(400, 400, seed=2), None)]
+    base = encoder.encode_base(images)
+    # The request has room for everything, but one image is over the per-image cap
+    budget = (sum(item.nbytes for item in base), base[1].nbytes // 2)
+
+    fitted = encoder.fit_budget(images, base, budget)
+
+    assert fitted[0] is base[0] and fitted[2] is base[2]
+    assert fitted[1].nbytes <= budget[1]
+
+
+def test_claude_tray_is_capped_per_image_not_per_request(encoding_service):
+    encoder = ImageEncoder(encoding_service)
+    # Seven images of about 1.5 MB each: over the old 3.75 MB request budget, under 5 MB per image
+    images = [(_noise(700, 700, seed=seed), None) for seed in range(7)]
+
+    encoded = encoder.prepare(images, UPLOAD_BYTE_BUDGETS['claude'])
+
+    assert [item.size for item in encoded] == [(700, 700)] * 7
+
+
+def test_budgets_fit_limits_once_base64_encoded():
+    for provider, (request_limit, image_limit) in UPLOAD_LIMITS.items():
+        request_bytes, image_bytes = UPLOAD_BYTE_BUDGETS[provider]
+        assert -(-request_bytes // 3) * 4 <= request_limit
+        assert -(-image_bytes // 3) * 4 <= image_limit
+    assert upload_budget(20 * 1000 * 1000, 5 * 1000 * 1000)[1] == 3750000
+
+
+def test_encode_untrimmed_measures_whole_image_at_upload_scale(encoding_service):
+    encoder = ImageEncoder(encoding_service)
+    image = _noise(600, 400)
+    images = [(image, (100, 100, 400, 300)), (_noise(300, 300, seed=1), None)]
+    encoded = encoder.prepare(images, byte_budget=(10 * 1024 * 1024, 10 * 1024 * 1024))
+
+    futures = encoder.encode_untrimmed(images, encoded)
+
+    assert futures[1] is None
+    data, size = futures[0].result()
+    assert size == (600, 400)
+    assert len(data) > encoded[0].nbytes
+
+
+def test_encode_untrimmed_follows_budget_downscaling(encoding_service):
+    encoder = ImageEncoder(encoding_service)
+    images = [(_noise(1200, 800), (0, 0, 600, 800))]
+    encoded = encoder.prepare(images, byte_budget=(600 * 1024, 600 * 1024))
+
+    data, size = encoder.encode_untrimmed(images, encoded)[0].result()
+
+    assert encoded[0].size[0] < 600
+    assert abs(size[0] - encoded[0].size[0] * 2) <= 2
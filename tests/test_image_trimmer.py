@@ -0,0 +1,86 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+from image_trimmer import CONTENT_MARGIN, compute_crop_box, find_border_box, find_detail_box
+
+
+def _page(size=(800, 600), box=(200, 150, 500, 400)):
+    """White page with a block of black text-like stripes inside box"""
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    for y in range(box[1], box[3], 6):
+        draw.rectangle((box[0], y, box[2] - 1, y + 2), fill='black')
+    return image
+
+
+def test_find_border_box():
+    gray = np.full((100, 120), 240, dtype=np.int16)
+    gray[20:60, 30:90] = 10
+
+    assert find_border_box(gray) == (30, 20, 90, 60)
+
+
+def test_find_border_box_uniform_image():
+    assert find_border_box(np.full((50, 50), 128, dtype=np.int16)) is None
+
+
+def test_find_border_box_ignores_small_noise():
+    gray = np.full((50, 50), 128, dtype=np.int16)
+    gray[10, 10] = 135
+
+    assert find_border_box(gray) is None
+
+
+def test_find_detail_box_skips_flat_panel():
+    # A faint flat panel on the left and striped detail on the right
+    gray = np.zeros((100, 200), dtype=np.int16)
+    gray[:, :80] = 15
+    gray[20:80:4, 120:180] = 255
+
+    # Falling edges mark the pixel after each stripe
+    assert find_detail_box(gray) == (120, 20, 181, 78)
+
+
+def test_find_detail_box_without_detail():
+    assert find_detail_box(np.full((40, 40), 90, dtype=np.int16)) is None
+
+
+def test_compute_crop_box_trims_margins():
+    left, top, right, bottom = compute_crop_box(_page())
+
+    assert 200 - CONTENT_MARGIN - 2 <= left <= 200 and 500 <= right <= 500 + CONTENT_MARGIN + 2
+    assert 150 - CONTENT_MARGIN - 2 <= top <= 150 and 396 <= bottom <= 400 + CONTENT_MARGIN + 2
+
+
+def test_compute_crop_box_keeps_full_content():
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 256, (300, 400, 3), dtype=np.uint8))
+
+    assert compute_crop_box(image) is None
+
+
+def test_compute_crop_box_without_trim_uses_window():
+    assert compute_crop_box(_page(), trim=False, window_rect=(100, 50, 700, 550)) == (100, 50, 700, 550)
+
+
+def test_compute_crop_box_clips_window_to_image():
+    assert compute_crop_box(_page(), trim=False, window_rect=(-50, -50, 400, 300)) == (0, 0, 400, 300)
+
+
+def test_compute_crop_box_ignores_tiny_window():
+    assert compute_crop_box(_page(), trim=False, window_rect=(10, 10, 15, 15)) is None
+
+
+def test_compute_crop_box_trims_inside_window():
+    box = compute_crop_box(_page(), trim=True, window_rect=(100, 100, 700, 500))
+
+    assert box[0] >= 100 and box[1] >= 100 and box[2] <= 700 and box[3] <= 500
+    assert box[2] - box[0] < 400
+
+
+def test_compute_crop_box_large_image_scales_box_back():
+    image = _page(size=(3840, 2160), box=(1000, 500, 2000, 1500))
+
+    left, top, right, bottom = compute_crop_box(image)
+
+    assert abs(left - 1000) <= 2 * CONTENT_MARGIN and abs(right - 2000) <= 2 * CONTENT_MARGIN
+    assert abs(top - 500) <= 2 * CONTENT_MARGIN and abs(bottom - 1500) <= 2 * CONTENT_MARGIN
@@ -0,0 +1,107 @@
+import pytest
+
+from providers import build_request, parse_response, send_request
+from transport import HttpTransport, TransportResponse
+
+PROVIDERS = ['openai', 'gemini', 'claude']
+
+
+@pytest.mark.parametrize('provider', PROVIDERS)
+def test_send_request_to_fake_server(fake_server, encoded_images, provider):
+    server = fake_server()
+    transport = HttpTransport(base_urls=server.base_urls)
+
+    answer = send_request(transport, provider, "What is this?", encoded_images, 'test-key')
+
+    assert answer == f"Fake {provider} response for 2 image(s)"
+
+
+@pytest.mark.parametrize('provider', PROVIDERS)
+def test_scripted_reply_text(fake_server, encoded_images, provider):
+    server = fake_server({provider: [{"text": "First"}, {"text": "Second"}]})
+    transport = HttpTransport(base_urls=server.base_urls)
+
+    answers = [send_request(transport, provider, "Q", encoded_images, 'test-key') for _ in range(3)]
+
+    assert answers == ["First", "Second", "Second"]
+
+
+@pytest.mark.parametrize('provider, name', [('openai', "OpenAI"), ('gemini', "Gemini"), ('claude', "Claude")])
+def test_error_status_raises(fake_server, encoded_images, provider, name):
+    server = fake_server({provider: {"status": 429, "text": "Rate limited"}})
+    transport = HttpTransport(base_urls=server.base_urls)
+
+    with pytest.raises(Exception, match=f"{name} API Error: 429"):
+        send_request(transport, provider, "Q", encoded_images, 'test-key')
+
+
+def test_build_request_puts_api_key_in_headers_only(encoded_images):
+    for provider in PROVIDERS:
+        path, headers, body = build_request(provider, "Q", encoded_images, 'secret-key')
+        assert path.startswith('/')
+        assert any('secret-key' in value for value in headers.values())
+        assert 'secret-key' not in str(body)
+
+
+def test_claude_labels_images_before_question(encoded_images):
+    _, _, body = build_request('claude', "Q", encoded_images, 'key')
+    content = body['messages'][0]['content']
+
+    assert [block['type'] for block in content] == ['text', 'image', 'text', 'image', 'text']
+    assert content[-1]['text'] == "Q"
+
+
+def test_claude_single_image_is_not_labelled(encoded_images):
+    _, _, body = build_request('claude', "Q", encoded_images[:1], 'key')
+
+    assert [block['type'] for block in body['messages'][0]['content']] == ['image', 'text']
+
+
+def test_openai_question_before_images(encoded_images):
+    _, _, body = build_request('openai', "Q", encoded_images, 'key')
+    content = body['messages'][0]['content']
+
+    assert [block['type'] for block in content] == ['text', 'image_url', 'image_url']
+    assert content[0]['text'] == "Q"
+    assert content[1]['image_url']['url'] == f"data:image/png;base64,{encoded_images[0].b64}"
+
+
+def test_gemini_question_before_inline_images(encoded_images):
+    _, _, body = build_request('gemini', "Q", encoded_images, 'key')
+    parts = body['contents'][0]['parts']
+
+    assert parts[0] == {"text": "Q"}
+    assert [part['inline_data']['data'] for part in parts[1:]] == [image.b64 for image in encoded_images]
+    assert all(part['inline_data']['mime_type'] == 'image/png' for part in parts[1:])
+
+
+def test_unknown_provider():
+    with pytest.raises(ValueError, match="Unknown API"):
+        build_request('other', "Q", [], 'key')
+
+
+def test_gemini_blocked_candidate():
+    response = TransportResponse(200, '{"candidates": [{"finishReason": "SAFETY", "index": 0}]}')
+
+    with pytest.raises(Exception, match=r"Gemini API Error: Response blocked \(SAFETY\)"):
+        parse_response('gemini', response)
+
+
+def test_gemini_blocked_prompt():
+    response = TransportResponse(200, '{"promptFeedback": {"blockReason": "OTHER"}}')
+
+    with pytest.raises(Exception, match=r"Gemini API Error: Response blocked \(OTHER\)"):
+        parse_response('gemini', response)
+
+
+def test_gemini_blocked_reply_from_fake_server(fake_server, encoded_images):
+    server = fake_server({"gemini": {"body": {"candidates": [{"finishReason": "RECITATION"}]}}})
+    transport = HttpTransport(base_urls=server.base_urls)
+
+    with pytest.raises(Exception, match=r"Response blocked \(RECITATION\)"):
+        send_request(transport, 'gemini', "Q", encoded_images, 'test-key')
+
+
+def test_invalid_json_response():
+    with pytest.raises(Exception, match="OpenAI API Error: Invalid JSON response"):
+        parse_response('openai', TransportResponse(200, '<html>Bad gateway</html>'))
@@ -0,0 +1,91 @@
+"""Regression checks on what request building sends and how long requests take offline"""
+import json
+import time
+
+import numpy as np
+import pytest
+
+from image_encoder import EncodedImage
+from providers import build_request, parse_response, send_request
+from transport import HttpTransport, RecordingTransport, TransportResponse, create_transport
+
+QUESTION = "What changed between these screenshots?"
+
+# JSON around the images for QUESTION and the fixed batch below; growth here is sent on every request
+PAYLOAD_OVERHEAD = {'openai': 380, 'gemini': 267, 'claude': 549}
+
+
+@pytest.fixture
+def batch():
+    rng = np.random.default_rng(0)
+    return [EncodedImage(rng.bytes(30000 + 1000 * n), (800, 600)) for n in range(3)]
+
+
+@pytest.mark.parametrize('provider', sorted(PAYLOAD_OVERHEAD))
+def test_payload_size_is_pinned(batch, provider):
+    _, _, body = build_request(provider, QUESTION, batch, 'key')
+    payload = json.dumps(body)
+
+    assert len(payload.encode('utf-8')) - sum(len(image.b64) for image in batch) == PAYLOAD_OVERHEAD[provider]
+    # Every image is attached exactly once
+    assert all(payload.count(image.b64) == 1 for image in batch)
+
+
+def test_build_reuses_base64_without_copying(batch):
+    # Each image is base64-encoded once by EncodedImage; request building must not re-encode it
+    _, _, gemini = build_request('gemini', QUESTION, batch, 'key')
+    _, _, claude = build_request('claude', QUESTION, batch, 'key')
+
+    gemini_data = [part['inline_data']['data'] for part in gemini['contents'][0]['parts'][1:]]
+    claude_data = [block['source']['data'] for block in claude['messages'][0]['content']
+                   if block['type'] == 'image']
+    assert all(data is image.b64 for data, image in zip(gemini_data, batch))
+    assert all(data is image.b64 for data, image in zip(claude_data, batch))
+    assert len(gemini_data) == len(claude_data) == len(batch)
+
+
+def test_parse_large_response():
+    text = "x" * (2 * 1024 * 1024)
+    response = TransportResponse(200, json.dumps({"content": [{"type": "text", "text": text}]}))
+
+    assert parse_response('claude', response) == text
+
+
+@pytest.mark.parametrize('provider', sorted(PAYLOAD_OVERHEAD))
+def test_fake_server_receives_pinned_payload(fake_server, batch, provider):
+    server = fake_server()
+    transport = HttpTransport(base_urls=server.base_urls)
+
+    send_request(transport, provider, QUESTION, batch, 'key')
+
+    expected = sum(len(image.b64) for image in batch) + PAYLOAD_OVERHEAD[provider]
+    assert server.requests == [(provider, expected, len(batch))]
+
+
+def test_request_time_tracks_scripted_latency(fake_server, batch):
+    server = fake_server({"gemini": {"latency": 0.3}})
+    transport = HttpTransport(base_urls=server.base_urls)
+    transport.warm_up('gemini')
+
+    start = time.perf_counter()
+    send_request(transport, 'gemini', QUESTION, batch, 'key')
+    elapsed = time.perf_counter() - start
+
+    # Building, sending and parsing add well under a second on top of the server's latency
+    assert 0.3 <= elapsed < 1.3
+
+
+def test_replay_latency_reproduces_recorded_timing(fake_server, tmp_path, batch):
+    server = fake_server({"openai": {"latency": 0.3}})
+    recorder = RecordingTransport(HttpTransport(base_urls=server.base_urls), str(tmp_path))
+    send_request(recorder, 'openai', QUESTION, batch, 'key')
+
+    timings = {}
+    for replay_latency in (False, True):
+        transport = create_transport('replay', cassette_dir=str(tmp_path), replay_latency=replay_latency)
+        start = time.perf_counter()
+        send_request(transport, 'openai', QUESTION, batch, 'key')
+        timings[replay_latency] = time.perf_counter() - start
+
+    assert timings[False] < 0.2
+    assert 0.3 <= timings[True] < 1.3
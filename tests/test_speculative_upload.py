@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_encoder import UPLOAD_BYTE_BUDGETS, ImageEncoder
+from providers import send_request
+from speculative_upload import SpeculativeUploader
+from transport import HttpTransport
+
+
+def _noise(width, height, seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+@pytest.fixture
+def uploader(encoding_service):
+    uploader = SpeculativeUploader(ImageEncoder(encoding_service))
+    yield uploader
+    uploader.shutdown()
+
+
+def test_ask_path_uses_speculative_encoding(uploader, fake_server):
+    """The app's ask path: schedule on capture, take on ask, send through the transport"""
+    server = fake_server()
+    transport = HttpTransport(base_urls=server.base_urls)
+    images = [(_noise(400, 300), None), (_noise(500, 500, seed=1), (50, 50, 450, 450))]
+    budgets = {'claude': UPLOAD_BYTE_BUDGETS['claude'], 'openai': UPLOAD_BYTE_BUDGETS['openai']}
+
+    uploader.schedule(images, budgets, warm_up=lambda: transport.warm_up('claude'))
+    encoded, pre_encoded = uploader.take_or_prepare(list(images), 'claude', budgets['claude'])
+    answer = send_request(transport, 'claude', "Q", encoded, 'key')
+
+    assert pre_encoded
+    assert [item.size for item in encoded] == [(400, 300), (400, 400)]
+    assert answer == "Fake claude response for 2 image(s)"
+    assert server.requests[0][0] == 'claude' and server.requests[0][2] == 2
+
+
+def test_ask_path_encodes_when_nothing_was_prepared(uploader, fake_server):
+    server = fake_server()
+    transport = HttpTransport(base_urls=server.base_urls)
+    images = [(_noise(300, 300), None)]
+    uploader.schedule([(_noise(300, 300, seed=1), None)], {'gemini': UPLOAD_BYTE_BUDGETS['gemini']})
+
+    encoded, pre_encoded = uploader.take_or_prepare(images, 'gemini', UPLOAD_BYTE_BUDGETS['gemini'])
+    answer = send_request(transport, 'gemini', "Q", encoded, 'key')
+
+    assert not pre_encoded
+    assert answer == "Fake gemini response for 1 image(s)"
+
+
+def test_take_requires_matching_budget(uploader):
+    images = [(_noise(200, 200), None)]
+    uploader.schedule(images, {'openai': UPLOAD_BYTE_BUDGETS['openai']})
+
+    assert uploader.take(images, 'openai', UPLOAD_BYTE_BUDGETS['claude']) is None
+    assert uploader.take(images, 'claude', UPLOAD_BYTE_BUDGETS['claude']) is None
+    assert uploader.take(images, 'openai', UPLOAD_BYTE_BUDGETS['openai'])[0].size == (200, 200)
+
+
+def test_new_schedule_cancels_previous(uploader):
+    first = [(_noise(200, 200), None)]
+    second = [(_noise(200, 200, seed=1), None)]
+    budgets = {'openai': UPLOAD_BYTE_BUDGETS['openai']}
+
+    uploader.schedule(first, budgets)
+    uploader.schedule(second, budgets)
+
+    assert uploader.take(first, 'openai', budgets['openai']) is None
+    assert uploader.take(second, 'openai', budgets['openai']) is not None
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+import tiled_capture
+from tiled_capture import TiledCapture, analyse_tile, split_rect
+
+
+def _noise(width, height, seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+@pytest.fixture
+def desktop(monkeypatch):
+    """Two monitors side by side; tests paint on the returned images"""
+    screens = {
+        (0, 0, 2000, 1200): Image.new('RGB', (2000, 1200), 'white'),
+        (2000, 0, 3000, 800): Image.new('RGB', (1000, 800), 'white')
+    }
+
+    def grab_region(bbox):
+        for rect, image in screens.items():
+            if rect[0] <= bbox[0] and bbox[2] <= rect[2] and rect[1] <= bbox[1] and bbox[3] <= rect[3]:
+                return image.crop((bbox[0] - rect[0], bbox[1] - rect[1], bbox[2] - rect[0], bbox[3] - rect[1]))
+        raise AssertionError(f"{bbox} spans monitors")
+
+    monkeypatch.setattr(tiled_capture, 'get_monitor_rects', lambda: list(screens))
+    monkeypatch.setattr(tiled_capture, 'grab_region', grab_region)
+    return screens
+
+
+def test_split_rect_covers_rect_without_overlap():
+    tiles = split_rect((100, 50, 3940, 2210), 1600)
+
+    assert len(tiles) == 6
+    assert all(right - left <= 1600 and bottom - top <= 1600 for left, top, right, bottom in tiles)
+    assert sum((right - left) * (bottom - top) for left, top, right, bottom in tiles) == 3840 * 2160
+    assert tiles[0][:2] == (100, 50) and tiles[-1][2:] == (3940, 2210)
+
+
+def test_split_rect_small_rect_is_one_tile():
+    assert split_rect((0, 0, 800, 600), 1600) == [(0, 0, 800, 600)]
+
+
+def test_analyse_tile_blank():
+    blank, detail, signature = analyse_tile(Image.new('RGB', (300, 200), (40, 40, 40)))
+
+    assert blank and detail == 0.0
+    assert signature.shape == (32, 32)
+
+
+def test_analyse_tile_detail_ranks_busy_tiles_higher():
+    text = Image.new('RGB', (400, 400), 'white')
+    draw = ImageDraw.Draw(text)
+    for y in range(0, 400, 10):
+        draw.line((20, y, 200, y), fill='black')
+
+    _, text_detail, _ = analyse_tile(text)
+    blank, noise_detail, _ = analyse_tile(_noise(400, 400))
+
+    assert not blank
+    assert 0 < text_detail < noise_detail
+
+
+def test_capture_skips_blank_tiles_and_builds_overview(desktop):
+    desktop[(0, 0, 2000, 1200)].paste(_noise(500, 500), (100, 100))
+
+    result = TiledCapture(tile_size=1200, overview_edge=600).capture()
+
+    assert len(result.tiles) == 3
+    assert [tile.rect for tile in result.detail_tiles] == [(0, 0, 1000, 1200)]
+    assert sum(tile.blank for tile in result.tiles) == 2
+    assert result.overview.size == (600, 240)
+    assert result.to_overview_box((2000, 0, 3000, 800)) == (400, 0, 600, 160)
+
+
+def test_capture_keeps_most_detailed_tiles(desktop):
+    desktop[(0, 0, 2000, 1200)].paste(_noise(2000, 1200), (0, 0))
+    screen = desktop[(2000, 0, 3000, 800)]
+    ImageDraw.Draw(screen).line((0, 400, 1000, 400), fill='black')
+
+    result = TiledCapture(tile_size=500, max_detail_tiles=3).capture()
+
+    assert len(result.detail_tiles) == 3
+    assert all(tile.rect[2] <= 2000 for tile in result.detail_tiles)
+
+
+def test_unchanged_tiles_reuse_retained_images(desktop):
+    screen = desktop[(0, 0, 2000, 1200)]
+    screen.paste(_noise(2000, 1200), (0, 0))
+    capture = TiledCapture(tile_size=1200)
+
+    first = capture.capture()
+    retained = [tile.image for tile in first.detail_tiles]
+    # Block averages of noise barely move, so paint a white window over it
+    screen.paste(Image.new('RGB', (600, 600), 'white'), (1200, 100))
+    second = capture.capture(retained=retained)
+
+    reused = [tile for tile in second.detail_tiles if tile.reused]
+    changed = [tile for tile in second.detail_tiles if not tile.reused]
+    assert [tile.rect for tile in reused] == [(0, 0, 1000, 1200)]
+    assert reused[0].image is first.detail_tiles[0].image
+    assert [tile.rect for tile in changed] == [(1000, 0, 2000, 1200)]
+
+
+def test_unchanged_tiles_are_grabbed_again_when_not_retained(desktop):
+    desktop[(0, 0, 2000, 1200)].paste(_noise(2000, 1200), (0, 0))
+    capture = TiledCapture(tile_size=1200)
+
+    first = capture.capture()
+    second = capture.capture(retained=[])
+
+    assert len(second.detail_tiles) == len(first.detail_tiles) == 2
+    assert all(tile.unchanged and not tile.reused for tile in second.detail_tiles)
+    assert all(tile.image is not None for tile in second.detail_tiles)
+
+
+def test_capture_falls_back_to_screen_size(monkeypatch):
+    monkeypatch.setattr(tiled_capture, 'get_monitor_rects', lambda: None)
+    monkeypatch.setattr(tiled_capture, 'grab_region',
+                        lambda bbox: Image.new('RGB', (bbox[2] - bbox[0], bbox[3] - bbox[1])))
+
+    result = TiledCapture(tile_size=1000).capture(fallback_size=(1500, 900))
+
+    assert [tile.rect for tile in result.tiles] == [(0, 0, 750, 900), (750, 0, 1500, 900)]
+    with pytest.raises(Exception, match="Could not determine the desktop size"):
+        TiledCapture().capture()
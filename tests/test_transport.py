@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from providers import send_request
+from transport import HttpTransport, RecordingTransport, ReplayTransport, create_transport
+
+PROVIDERS = ['openai', 'gemini', 'claude']
+
+
+def _record(server, cassette_dir, provider, questions, encoded_images, api_key='sk-live-secret-key'):
+    transport = RecordingTransport(HttpTransport(base_urls=server.base_urls), str(cassette_dir))
+    return [send_request(transport, provider, question, encoded_images, api_key) for question in questions]
+
+
+@pytest.mark.parametrize('provider', PROVIDERS)
+def test_record_then_replay(fake_server, tmp_path, encoded_images, provider):
+    server = fake_server({provider: [{"text": "One"}, {"text": "Two"}]})
+    recorded = _record(server, tmp_path, provider, ["First?", "Second?"], encoded_images)
+
+    # Replay uses different API keys; only the scrubbed bodies have to match
+    replay = ReplayTransport(str(tmp_path))
+    replayed = [send_request(replay, provider, question, encoded_images, 'another-key')
+                for question in ["First?", "Second?", "First?"]]
+
+    assert recorded == ["One", "Two"]
+    assert replayed == ["One", "Two", "One"]
+    assert replay.offline
+
+
+def test_replay_matches_out_of_order_requests(fake_server, tmp_path, encoded_images):
+    server = fake_server({"openai": [{"text": "One"}, {"text": "Two"}]})
+    _record(server, tmp_path, 'openai', ["First?", "Second?"], encoded_images)
+
+    replay = ReplayTransport(str(tmp_path))
+
+    assert send_request(replay, 'openai', "Second?", encoded_images, 'key') == "Two"
+    assert send_request(replay, 'openai', "First?", encoded_images, 'key') == "One"
+
+
+def test_replay_detects_changed_question(fake_server, tmp_path, encoded_images):
+    server = fake_server()
+    _record(server, tmp_path, 'claude', ["First?"], encoded_images)
+
+    with pytest.raises(Exception, match="does not match any recorded request body"):
+        send_request(ReplayTransport(str(tmp_path)), 'claude', "Different?", encoded_images, 'key')
+
+
+def test_replay_detects_changed_image(fake_server, tmp_path, encoded_images):
+    server = fake_server()
+    _record(server, tmp_path, 'gemini', ["First?"], encoded_images)
+
+    with pytest.raises(Exception, match="does not match any recorded request body"):
+        send_request(ReplayTransport(str(tmp_path)), 'gemini', "First?", encoded_images[:1], 'key')
+
+
+def test_replay_without_body_matching(fake_server, tmp_path, encoded_images):
+    server = fake_server({"openai": {"text": "Recorded"}})
+    _record(server, tmp_path, 'openai', ["First?"], encoded_images)
+
+    replay = ReplayTransport(str(tmp_path), match_body=False)
+
+    assert send_request(replay, 'openai', "Anything", [], 'key') == "Recorded"
+
+
+def test_replay_missing_cassette(tmp_path, encoded_images):
+    with pytest.raises(Exception, match="No recorded exchanges for claude"):
+        send_request(ReplayTransport(str(tmp_path)), 'claude', "Q", encoded_images, 'key')
+
+
+def test_cassette_has_no_secrets_or_image_data(fake_server, tmp_path, encoded_images):
+    # The fake server echoes the key back in its error, as some real APIs do
+    server = fake_server({"openai": [{"text": "Fine"}, {"status": 401, "text": "Bad key sk-live-secret-key"}]})
+    _record(server, tmp_path, 'openai', ["First?"], encoded_images)
+    with pytest.raises(Exception, match="401"):
+        _record(server, tmp_path, 'openai', ["Second?"], encoded_images)
+
+    with open(os.path.join(tmp_path, 'openai.json')) as f:
+        text = f.read()
+    cassette = json.loads(text)
+
+    assert len(cassette['exchanges']) == 2
+    assert 'sk-live-secret-key' not in text
+    assert encoded_images[0].b64 not in text
+    assert cassette['exchanges'][0]['request']['headers']['Authorization'] == '<redacted>'
+
+
+def test_create_transport_fake_mode(encoded_images):
+    transport = create_transport('fake')
+    try:
+        assert transport.offline
+        answer = send_request(transport, 'gemini', "Q", encoded_images, '')
+        assert answer == "Fake gemini response for 2 image(s)"
+    finally:
+        transport.server.stop()
+
+
+def test_create_transport_unknown_mode():
+    with pytest.raises(ValueError, match="Unknown transport mode"):
+        create_transport('other')
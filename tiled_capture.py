@@ -0,0 +1,278 @@
+import ctypes
+import sys
+from contextlib import contextmanager
+import numpy as np
+from PIL import Image, ImageGrab
+
+# Largest tile edge; monitors bigger than this are split into a grid
+TILE_SIZE = 1600
+
+# Longest edge of the low-resolution overview of the whole desktop
+OVERVIEW_EDGE = 1024
+
+# Only the most detailed tiles are kept at full resolution
+MAX_DETAIL_TILES = 6
+
+# Tiles whose grayscale range is below this count as blank
+BLANK_RANGE = 12
+
+# Mean per-pixel difference of the tile signatures below which a tile is unchanged
+UNCHANGED_DIFF = 2.0
+
+# Tiles are compared using a tiny grayscale thumbnail
+SIGNATURE_SIZE = (32, 32)
+
+# Minimum brightness step between neighbouring pixels that counts as detail
+DETAIL_THRESHOLD = 24
+
+# Physical-pixel coordinates on every monitor, whatever its scaling
+DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2 = -4
+
+
+@contextmanager
+def dpi_aware():
+    """Make the calling thread per-monitor DPI aware, as Pillow does around its own grabs (Windows only)
+
+    Without this, screen and window coordinates are virtualised to 96 DPI on
+    scaled monitors and GDI copies come out downscaled.
+    """
+    if sys.platform != 'win32':
+        yield
+        return
+
+    user32 = ctypes.windll.user32
+    set_context = getattr(user32, 'SetThreadDpiAwarenessContext', None)  # Windows 10 1607+
+    if set_context is None:
+        yield
+        return
+
+    set_context.restype = ctypes.c_void_p
+    set_context.argtypes = [ctypes.c_void_p]
+    previous = set_context(DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2)
+    try:
+        yield
+    finally:
+        if previous:
+            set_context(previous)
+
+
+def get_monitor_rects():
+    """Screen rectangles of all monitors in virtual desktop coordinates (Windows only)"""
+    if sys.platform != 'win32':
+        return None
+
+    import ctypes.wintypes
+
+    rects = []
+    MonitorEnumProc = ctypes.WINFUNCTYPE(ctypes.wintypes.BOOL, ctypes.wintypes.HMONITOR,
+                                         ctypes.wintypes.HDC, ctypes.POINTER(ctypes.wintypes.RECT),
+                                         ctypes.wintypes.LPARAM)
+
+    def callback(monitor, dc, rect, data):
+        r = rect.contents
+        rects.append((r.left, r.top, r.right, r.bottom))
+        return True
+
+    with dpi_aware():
+        ctypes.windll.user32.EnumDisplayMonitors(None, None, MonitorEnumProc(callback), 0)
+    return rects or None
+
+
+def split_rect(rect, tile_size=TILE_SIZE):
+    """Split rect into a grid of tiles no larger than tile_size on either edge"""
+    left, top, right, bottom = rect
+    columns = max(1, -(-(right - left) // tile_size))
+    rows = max(1, -(-(bottom - top) // tile_size))
+    xs = [left + (right - left) * i // columns for i in range(columns + 1)]
+    ys = [top + (bottom - top) * i // rows for i in range(rows + 1)]
+    return [(xs[c], ys[r], xs[c + 1], ys[r + 1]) for r in range(rows) for c in range(columns)]
+
+
+def _grab_region_win32(bbox):
+    """Copy just bbox off the screen with GDI; ImageGrab always grabs the whole desktop first"""
+    import ctypes.wintypes
+    wintypes = ctypes.wintypes
+
+    user32 = ctypes.windll.user32
+    gdi32 = ctypes.windll.gdi32
+    user32.GetDC.restype = wintypes.HDC
+    user32.GetDC.argtypes = [wintypes.HWND]
+    user32.ReleaseDC.argtypes = [wintypes.HWND, wintypes.HDC]
+    gdi32.CreateCompatibleDC.restype = wintypes.HDC
+    gdi32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+    gdi32.CreateCompatibleBitmap.restype = wintypes.HBITMAP
+    gdi32.CreateCompatibleBitmap.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int]
+    gdi32.SelectObject.restype = wintypes.HGDIOBJ
+    gdi32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+    gdi32.BitBlt.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                             wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.DWORD]
+    gdi32.GetDIBits.argtypes = [wintypes.HDC, wintypes.HBITMAP, wintypes.UINT, wintypes.UINT,
+                                ctypes.c_void_p, ctypes.c_void_p, wintypes.UINT]
+    gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+    gdi32.DeleteDC.argtypes = [wintypes.HDC]
+
+    class BITMAPINFOHEADER(ctypes.Structure):
+        _fields_ = [
+            ('biSize', wintypes.DWORD),
+            ('biWidth', wintypes.LONG),
+            ('biHeight', wintypes.LONG),
+            ('biPlanes', wintypes.WORD),
+            ('biBitCount', wintypes.WORD),
+            ('biCompression', wintypes.DWORD),
+            ('biSizeImage', wintypes.DWORD),
+            ('biXPelsPerMeter', wintypes.LONG),
+            ('biYPelsPerMeter', wintypes.LONG),
+            ('biClrUsed', wintypes.DWORD),
+            ('biClrImportant', wintypes.DWORD)
+        ]
+
+    SRCCOPY = 0x00CC0020
+    CAPTUREBLT = 0x40000000
+
+    left, top, right, bottom = bbox
+    width, height = right - left, bottom - top
+
+    screen_dc = user32.GetDC(None)
+    memory_dc = gdi32.CreateCompatibleDC(screen_dc)
+    bitmap = gdi32.CreateCompatibleBitmap(screen_dc, width, height)
+    previous = gdi32.SelectObject(memory_dc, bitmap)
+    try:
+        if not gdi32.BitBlt(memory_dc, 0, 0, width, height, screen_dc, left, top, SRCCOPY | CAPTUREBLT):
+            raise Exception("BitBlt failed")
+
+        header = BITMAPINFOHEADER()
+        header.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+        header.biWidth = width
+        header.biHeight = -height  # top-down rows
+        header.biPlanes = 1
+        header.biBitCount = 32
+        buffer = ctypes.create_string_buffer(width * height * 4)
+        if not gdi32.GetDIBits(memory_dc, bitmap, 0, height, buffer, ctypes.byref(header), 0):
+            raise Exception("GetDIBits failed")
+        return Image.frombuffer('RGB', (width, height), buffer, 'raw', 'BGRX', 0, 1)
+    finally:
+        gdi32.SelectObject(memory_dc, previous)
+        gdi32.DeleteObject(bitmap)
+        gdi32.DeleteDC(memory_dc)
+        user32.ReleaseDC(None, screen_dc)
+
+
+def grab_region(bbox):
+    """Capture one region of the virtual desktop"""
+    if sys.platform == 'win32':
+        with dpi_aware():
+            return _grab_region_win32(bbox)
+    return ImageGrab.grab(bbox=bbox, all_screens=True)
+
+
+def analyse_tile(image):
+    """Return (blank, detail score, signature) for a tile using vectorized NumPy"""
+    gray = image.convert('L')
+    signature = np.asarray(gray.resize(SIGNATURE_SIZE, Image.Resampling.BOX), dtype=np.int16)
+
+    factor = max(1, max(gray.size) // 512)
+    if factor > 1:
+        gray = gray.reduce(factor)
+    pixels = np.asarray(gray, dtype=np.int16)
+
+    blank = int(pixels.max()) - int(pixels.min()) < BLANK_RANGE
+    edges_x = np.abs(np.diff(pixels, axis=1)) > DETAIL_THRESHOLD
+    edges_y = np.abs(np.diff(pixels, axis=0)) > DETAIL_THRESHOLD
+    detail = (edges_x.mean() + edges_y.mean()) / 2 if pixels.size > 1 else 0.0
+    return blank, float(detail), signature
+
+
+class Tile:
+    """One captured region of the desktop"""
+    def __init__(self, rect, detail, blank, unchanged):
+        self.rect = rect
+        self.detail = detail
+        self.blank = blank
+        self.unchanged = unchanged
+        self.reused = False
+        self.image = None
+
+
+class TiledCaptureResult:
+    """Low-resolution overview of the desktop plus the full-resolution tiles worth sending"""
+    def __init__(self, overview, origin, scale, tiles):
+        self.overview = overview
+        self.origin = origin
+        self.scale = scale
+        self.tiles = tiles
+
+    @property
+    def detail_tiles(self):
+        return [tile for tile in self.tiles if tile.image is not None]
+    def to_overview_box(self, rect):
+        """Map a desktop rectangle onto the overview image"""
+        left, top, right, bottom = rect
+        x0, y0 = self.origin
+        return (int((left - x0) * self.scale), int((top - y0) * self.scale),
+                int((right - x0) * self.scale), int((bottom - y0) * self.scale))
+
+
+class TiledCapture:
+    """Captures the desktop tile by tile so memory scales with the content kept"""
+    def __init__(self, tile_size=TILE_SIZE, overview_edge=OVERVIEW_EDGE, max_detail_tiles=MAX_DETAIL_TILES):
+        self.tile_size = tile_size
+        self.overview_edge = overview_edge
+        self.max_detail_tiles = max_detail_tiles
+        self.signatures = {}
+        self.sent_tiles = {}
+
+    def capture(self, fallback_size=None, skip_unchanged=True, retained=()):
+        """Grab every tile, build the overview and keep the most detailed changed tiles
+
+        An unchanged tile reuses its image from the previous capture when that
+        image is still among retained (e.g. queued for sending), so requests
+        that already hold it keep the same object.
+        """
+        monitors = get_monitor_rects()
+        if not monitors:
+            if not fallback_size:
+                raise Exception("Could not determine the desktop size")
+            monitors = [(0, 0, fallback_size[0], fallback_size[1])]
+
+        x0 = min(rect[0] for rect in monitors)
+        y0 = min(rect[1] for rect in monitors)
+        desktop_width = max(rect[2] for rect in monitors) - x0
+        desktop_height = max(rect[3] for rect in monitors) - y0
+        scale = min(1.0, self.overview_edge / max(desktop_width, desktop_height))
+        overview = Image.new('RGB', (max(1, int(desktop_width * scale)), max(1, int(desktop_height * scale))))
+        result = TiledCaptureResult(overview, (x0, y0), scale, [])
+
+        retained_ids = {id(image) for image in retained}
+        signatures = {}
+        for monitor in monitors:
+            for rect in split_rect(monitor, self.tile_size):
+                image = grab_region(rect)
+
+                left, top, right, bottom = result.to_overview_box(rect)
+                overview.paste(image.resize((max(1, right - left), max(1, bottom - top)),
+                                            Image.Resampling.LANCZOS, reducing_gap=3.0), (left, top))
+
+                blank, detail, signature = analyse_tile(image)
+                previous = self.signatures.get(rect)
+                unchanged = previous is not None and float(np.abs(previous - signature).mean()) < UNCHANGED_DIFF
+                signatures[rect] = signature
+
+                tile = Tile(rect, detail, blank, unchanged)
+                result.tiles.append(tile)
+                if blank:
+                    continue
+
+                sent = self.sent_tiles.get(rect)
+                if skip_unchanged and unchanged and sent is not None and id(sent) in retained_ids:
+                    tile.reused = True
+                    image = sent
+
+                # Drop the least detailed full-resolution tile as soon as there are too many
+                tile.image = image
+                kept = sorted(result.detail_tiles, key=lambda t: t.detail, reverse=True)
+                for dropped in kept[self.max_detail_tiles:]:
+                    dropped.image = None
+
+        self.signatures = signatures
+        self.sent_tiles = {tile.rect: tile.image for tile in result.detail_tiles}
+        return result
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+
+# Where each provider's API lives; fake and replay transports stand in for these
+PROVIDER_BASE_URLS = {
+    'openai': 'https://api.openai.com',
+    'gemini': 'https://generativelanguage.googleapis.com',
+    'claude': 'https://api.anthropic.com'
+}
+
+# Request headers that carry API keys and must never be written to disk
+SECRET_HEADERS = ('authorization', 'x-api-key', 'x-goog-api-key')
+
+# Strings longer than this in recorded bodies (base64 images) are replaced by a digest
+MAX_RECORDED_STRING = 512
+
+
+class TransportResponse:
+    """Minimal stand-in for requests.Response returned by offline transports"""
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class HttpTransport:
+    """Sends provider requests over HTTP on a shared, keep-alive session"""
+    offline = False
+
+    def __init__(self, session=None, base_urls=None):
+        self.session = session or requests.Session()
+        self.base_urls = dict(PROVIDER_BASE_URLS, **(base_urls or {}))
+
+    def post(self, provider, path, headers, body, timeout=30):
+        return self.session.post(self.base_urls[provider] + path, headers=headers, json=body, timeout=timeout)
+
+    def warm_up(self, provider):
+        """Open the TLS connection to provider so the real request can reuse it"""
+        self.session.head(self.base_urls[provider], timeout=10)
+
+
+def _scrub_body(value):
+    """Replace large strings (encoded images) with a short digest"""
+    if isinstance(value, dict):
+        return {key: _scrub_body(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_scrub_body(item) for item in value]
+    if isinstance(value, str) and len(value) > MAX_RECORDED_STRING:
+        digest = hashlib.sha256(value.encode('utf-8')).hexdigest()[:16]
+        return f"<omitted {len(value)} chars sha256:{digest}>"
+    return value
+
+
+def _scrub_secrets(text, secrets):
+    for secret in secrets:
+        text = text.replace(secret, '<redacted>')
+    return text
+
+
+def _header_secrets(headers):
+    """API keys sent in headers, without any 'Bearer' prefix"""
+    return [value.split()[-1] for key, value in headers.items()
+            if key.lower() in SECRET_HEADERS and value.strip()]
+
+
+def _recorded_body(headers, body):
+    """Request body as it is written to a cassette: images digested and API keys redacted"""
+    return json.loads(_scrub_secrets(json.dumps(_scrub_body(body)), _header_secrets(headers)))
+
+
+class RecordingTransport:
+    """Wraps another transport and writes every exchange to a per-provider cassette"""
+    def __init__(self, inner, cassette_dir):
+        self.inner = inner
+        self.cassette_dir = cassette_dir
+        self.lock = threading.Lock()
+        self.offline = inner.offline
+        os.makedirs(cassette_dir, exist_ok=True)
+
+    def post(self, provider, path, headers, body, timeout=30):
+        start = time.perf_counter()
+        response = self.inner.post(provider, path, headers, body, timeout)
+        elapsed = time.perf_counter() - start
+
+        secrets = _header_secrets(headers)
+        exchange = {
+            'path': path,
+            'request': {
+                'headers': {key: '<redacted>' if key.lower() in SECRET_HEADERS else value
+                            for key, value in headers.items()},
+                'body': _scrub_body(body)
+            },
+            'response': {
+                'status_code': response.status_code,
+                'text': response.text
+            },
+            'elapsed': round(elapsed, 3)
+        }
+        # Error responses can echo key fragments back, so scrub the whole exchange
+        record = json.loads(_scrub_secrets(json.dumps(exchange), secrets))
+
+        with self.lock:
+            cassette_path = os.path.join(self.cassette_dir, f"{provider}.json")
+            cassette = {'exchanges': []}
+            if os.path.exists(cassette_path):
+                with open(cassette_path) as f:
+                    cassette = json.load(f)
+            cassette['exchanges'].append(record)
+            with open(cassette_path, 'w') as f:
+                json.dump(cassette, f, indent=2)
+
+        return response
+
+    def warm_up(self, provider):
+        self.inner.warm_up(provider)
+
+
+class ReplayTransport:
+    """Answers provider requests from recorded cassettes, in recording order
+
+    With match_body, each request must match the scrubbed body of a recorded
+    exchange; the next matching exchange in recording order is replayed.
+    """
+    offline = True
+
+    def __init__(self, cassette_dir, replay_latency=False, match_body=True):
+        self.cassette_dir = cassette_dir
+        self.replay_latency = replay_latency
+        self.match_body = match_body
+        self.lock = threading.Lock()
+        self.positions = {}
+        self.cassettes = {}
+
+    def _load(self, provider):
+        if provider not in self.cassettes:
+            cassette_path = os.path.join(self.cassette_dir, f"{provider}.json")
+            if not os.path.exists(cassette_path):
+                raise Exception(f"No recorded exchanges for {provider} in {self.cassette_dir}")
+            with open(cassette_path) as f:
+                self.cassettes[provider] = json.load(f)['exchanges']
+        return self.cassettes[provider]
+
+    def post(self, provider, path, headers, body, timeout=30):
+        with self.lock:
+            exchanges = [exchange for exchange in self._load(provider) if exchange['path'] == path]
+            if not exchanges:
+                raise Exception(f"No recorded exchanges for {provider} {path}")
+            # Cycle through the recording so long runs keep working
+            position = self.positions.get((provider, path), 0)
+            order = [(position + offset) % len(exchanges) for offset in range(len(exchanges))]
+            if self.match_body:
+                expected = _recorded_body(headers, body)
+                order = [index for index in order if exchanges[index]['request']['body'] == expected]
+                if not order:
+                    raise Exception(f"Request to {provider} {path} does not match any recorded request body")
+            self.positions[(provider, path)] = order[0] + 1
+            exchange = exchanges[order[0]]
+
+        if self.replay_latency:
+            time.sleep(exchange.get('elapsed', 0))
+        response = exchange['response']
+        return TransportResponse(response['status_code'], response['text'])
+
+    def warm_up(self, provider):
+        pass
+
+
+def create_transport(mode, session=None, cassette_dir='cassettes', fake_script=None, fake_url=None,
+                     replay_latency=False):
+    """Build the transport for mode: live, record, replay or fake
+
+    With replay_latency, replayed responses take as long as they did when recorded.
+    """
+    if mode == 'live':
+        return HttpTransport(session)
+    if mode == 'record':
+        return RecordingTransport(HttpTransport(session), cassette_dir)
+    if mode == 'replay':
+        return ReplayTransport(cassette_dir, replay_latency=replay_latency)
+    if mode == 'fake' and fake_url:
+        # A fake server that is already running, e.g. started by CI
+        transport = HttpTransport(session, base_urls={name: fake_url for name in PROVIDER_BASE_URLS})
+        transport.offline = True
+        return transport
+    if mode == 'fake':
+        from fake_provider import FakeProviderServer
+        server = FakeProviderServer(script=fake_script)
+        server.start()
+        transport = HttpTransport(session, base_urls=server.base_urls)
+        transport.offline = True
+        transport.server = server
+        return transport
+    raise ValueError(f"Unknown transport mode: {mode}")